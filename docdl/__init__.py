@@ -1,21 +1,80 @@
 """download documents from web portals"""
 
+# pylint: disable=C0302
+
+import collections.abc
+import contextlib
+import fnmatch
 import json
 import re
 import shutil
 import sys
+import tempfile
+import threading
 import time
 import os
+import uuid
 import platform
-import requests
+from selenium.common.exceptions import NoSuchElementException, TimeoutException
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 import jq
+import requests
 import watchdog.events
 import watchdog.observers
 
+import docdl.ratelimit
+import docdl.transport
 import docdl.util
 
+# ---------------------------------------------------------------------
+# request headers of sniffed downloads that are passed to requests
+# (cookies get copied from the browser anyway)
+SNIFF_HEADERS = ("accept", "accept-language", "referer")
+
+# partially downloaded files of browsers
+PARTIAL_DOWNLOADS = ["*.crdownload", "*.part", ".com.google.Chrome.*"]
+
+
+def _finished_download(directory):
+    """:result: name of the only file in directory if it's complete or None"""
+    names = os.listdir(directory)
+    if len(names) != 1 or any(
+        fnmatch.fnmatch(names[0], pattern) for pattern in PARTIAL_DOWNLOADS
+    ):
+        return None
+    return names[0]
+
+
+def _file_patterns(*extensions):
+    """:result: url patterns matching files with given extensions"""
+    return [
+        pattern
+        for extension in extensions
+        for pattern in (f"*.{extension}", f"*.{extension}?*")
+    ]
+
+
+# url patterns of resource categories that can be blocked in the browser
+RESOURCE_PATTERNS = {
+    "images": _file_patterns("png", "jpg", "jpeg", "gif", "webp", "svg", "ico"),
+    "fonts": _file_patterns("woff", "woff2", "ttf", "otf", "eot"),
+    "stylesheets": _file_patterns("css"),
+    "media": _file_patterns("mp3", "mp4", "ogg", "webm", "m4a"),
+    "trackers": [
+        "*doubleclick.net*",
+        "*google-analytics.com*",
+        "*googlesyndication.com*",
+        "*googletagmanager.com*",
+        "*adservice.google.*",
+        "*connect.facebook.net*",
+        "*criteo.*",
+        "*hotjar.com*",
+        "*scorecardresearch.com*",
+        "*bing.com/bat*",
+    ],
+}
+
 
 # ---------------------------------------------------------------------
 class AuthenticationError(Exception):
@@ -27,11 +86,73 @@ class DownloadError(Exception):
 
 
 # ---------------------------------------------------------------------
+# pylint: disable=R0903
+class Capabilities:
+    """
+    what a portal knows about its documents, used by the core to plan
+    runs (see WebPortal.CAPABILITIES)
+    """
+
+    # attribute costs, cheapest first
+    COSTS = ("listing", "details")
+
+    def __init__(
+        self, attributes=None, sort=None, downloads=("url",), concurrent=False
+    ):
+        """
+        :param attributes: dict attribute name -> cost: "listing" (known
+                           while listing) or "details" (needs a resolver
+                           that loads more pages). Undeclared attributes
+                           cost "listing".
+        :param sort: (attribute, "asc" or "desc") the listing is sorted by
+                     (documents without the attribute may follow at the
+                     end) or None
+        :param downloads: "url" (download with requests) and/or "click"
+                          (download elements)
+        :param concurrent: True if documents can be downloaded in parallel
+        """
+        self.attributes = attributes or {}
+        self.sort = sort
+        self.downloads = downloads
+        self.concurrent = concurrent
+
+    def cost(self, names):
+        """
+        :param names: attribute names or None (= all attributes)
+        :result: cost of reading the attributes as index into COSTS
+        """
+        if names is None:
+            names = self.attributes
+        return max(
+            (self.COSTS.index(self.attributes.get(name, "listing")) for name in names),
+            default=0,
+        )
+
+
+# ---------------------------------------------------------------------
+# pylint: disable=R0902
 class WebPortal:
     """base class for service portal to download documents from"""
 
     # default timeout (seconds)
     TIMEOUT = 15
+    # timeout for establishing connections (seconds)
+    CONNECT_TIMEOUT = 10
+    # how often to retry failed requests
+    RETRIES = 3
+    # backoff factor between retries (seconds)
+    RETRY_BACKOFF = 0.5
+    # connections to keep open per host
+    POOL_SIZE = 10
+    # requests per second and host (0 = unlimited)
+    RATE = 0
+    # requests per host that may be sent at once
+    BURST = 1
+    # True if a logged in portal can walk documents() again later
+    # (see document-dl serve)
+    KEEP_SESSION = False
+    # attributes, sort order and download methods of documents()
+    CAPABILITIES = Capabilities()
 
     def __init__(self, login_id, password, useragent=None, arguments=None):
         """
@@ -48,8 +169,26 @@ class WebPortal:
         self.login_id = login_id
         self.password = password
         self.useragent = useragent
+        # directory to save documents in
+        self.download_dir = os.path.abspath(
+            arguments.get("download_dir") or os.getcwd()
+        )
+        os.makedirs(self.download_dir, exist_ok=True)
+        # cursor to resume documents() from (see checkpoint())
+        self.resume = arguments.get("resume") or {}
+        # called with every cursor reported by checkpoint()
+        self.on_checkpoint = None
+        # limit requests of browser and requests session
+        self.ratelimiter = docdl.ratelimit.RateLimiter(self.RATE, self.BURST)
         # initialize requests HTTP session
-        self.session = requests.Session()
+        self.session = docdl.transport.create_session(
+            timeout=self.TIMEOUT,
+            connect_timeout=self.CONNECT_TIMEOUT,
+            retries=self.RETRIES,
+            backoff=self.RETRY_BACKOFF,
+            pool_size=self.POOL_SIZE,
+            ratelimiter=self.ratelimiter,
+        )
         # set user agent
         if useragent:
             self.session.headers["User-Agent"] = useragent
@@ -72,58 +211,110 @@ class WebPortal:
         """deauthenticate to service"""
         raise NotImplementedError(f"{self.__class__} needs a logout() method")
 
+    def activate(self):
+        """prepare logged in portal for another walk of documents()"""
+
     def documents(self):
         """
         generator that iterates all available and yields docdl.Documents()
         """
         raise NotImplementedError(f"{self.__class__} needs a documents() generator")
 
+    def checkpoint(self, **cursor):
+        """
+        report position documents() could be resumed from if the run gets
+        interrupted (e.g. the current page). An interrupted run that is
+        resumed passes the last reported cursor in self.resume.
+        Cursor values must be json serializable.
+        """
+        if self.on_checkpoint:
+            self.on_checkpoint(cursor)
+
     def download(self, document):
         """download document url"""
         # don't attempt download without url
         if not document.url:
             return None
         filename = self.download_with_requests(document)
-        return document.rename_after_download(filename)
+        return document.rename_after_download(filename, self.download_dir)
 
-    def download_with_requests(self, document):
-        """download a file without the browser using requests"""
-        # fetch url
-        req = self.session.get(
-            document.url, stream=True, headers=document.request_headers
-        )
-        if not req.ok:
-            raise DownloadError(f'"{document.url}" status code: {req.status_code}')
-
-        # filename not already set?
-        if "filename" in document.attributes:
-            filename = document.attributes["filename"]
-        # get filename from header
-        elif "content-disposition" in req.headers:
-            # @todo properly parse rfc6266
-            filename = re.findall(
-                "filename=([^; ]+)[;]?.*", req.headers["content-disposition"]
-            )[0]
-        else:
-            filename = None
+    def download_with_requests(self, document, session=None):
+        """
+        download a file without the browser using requests
 
-        # protect against empty filenames
-        if not filename:
-            if "title" in document.attributes:
-                filename = document.attributes["title"]
-            elif "id" in document.attributes:
-                filename = f"document-dl.{document.attributes['id']}"
+        :param document: docdl.Document with url
+        :param session: requests session to use instead of self.session
+                        (e.g. from new_session() in other threads)
+        """
+        # fetch url (close the connection when done)
+        with (session or self.session).get(
+            document.url, stream=True, headers=document.request_headers
+        ) as req:
+            if not req.ok:
+                raise DownloadError(f'"{document.url}" status code: {req.status_code}')
+            # remember how we downloaded
+            retries = getattr(req.raw, "retries", None)
+            document.download_info = {
+                "method": "requests",
+                "retries": len(retries.history) if retries else 0,
+            }
+
+            # filename not already set?
+            if "filename" in document.attributes:
+                filename = document.attributes["filename"]
+            # get filename from header
+            elif "content-disposition" in req.headers:
+                # @todo properly parse rfc6266
+                filename = re.findall(
+                    "filename=([^; ]+)[;]?.*", req.headers["content-disposition"]
+                )[0]
             else:
-                raise RuntimeError("no suitable filename")
-
-        # massage filename
-        filename = filename.replace('"', "").strip()
-        # save file
-        with open(os.path.join(os.getcwd(), filename), "wb") as doc:
-            for chunk in req.iter_content(chunk_size=4096):
-                doc.write(chunk)
+                filename = None
+
+            # protect against empty filenames
+            if not filename:
+                if "title" in document.attributes:
+                    filename = document.attributes["title"]
+                elif "id" in document.attributes:
+                    filename = f"document-dl.{document.attributes['id']}"
+                else:
+                    raise RuntimeError("no suitable filename")
+
+            # massage filename
+            filename = filename.replace('"', "").strip()
+            # save to unique temporary file first, so concurrent downloads
+            # of the same filename don't mix
+            partial = os.path.join(self.download_dir, f".docdl-{uuid.uuid4().hex}.part")
+            try:
+                with open(partial, "xb") as doc:
+                    for chunk in req.iter_content(chunk_size=4096):
+                        doc.write(chunk)
+                os.replace(partial, os.path.join(self.download_dir, filename))
+            except BaseException:
+                # open() may have failed before creating the file
+                with contextlib.suppress(FileNotFoundError):
+                    os.unlink(partial)
+                raise
+
+            return filename
+
+    def new_session(self):
+        """
+        requests sessions aren't thread safe, use a copy of self.session
+        in other threads. Transport adapters (connection pools, retries,
+        rate limits, cassettes) are shared.
 
-        return filename
+        :result: requests session with the current headers and cookies
+        """
+        session = requests.Session()
+        session.headers.update(self.session.headers)
+        session.cookies.update(self.session.cookies)
+        session.hooks = {
+            event: list(hooks) for event, hooks in self.session.hooks.items()
+        }
+        for prefix, adapter in self.session.adapters.items():
+            session.mount(prefix, adapter)
+        return session
 
 
 class SeleniumWebPortal(WebPortal):
@@ -131,6 +322,29 @@ class SeleniumWebPortal(WebPortal):
 
     WEBDRIVER = "chrome"
 
+    # when webdriver.get() returns: "normal" waits for the load event,
+    # "eager" for DOMContentLoaded, "none" returns immediately.
+    # Portals that explicitly wait for their elements can use "eager".
+    # Portals in a shared browser use the strategy of the browser.
+    PAGE_LOAD_STRATEGY = "normal"
+
+    # seconds between condition checks while waiting
+    POLL_FREQUENCY = 0.5
+
+    # resource categories (see RESOURCE_PATTERNS) this portal needs to
+    # work, e.g. for QR codes or captchas. They will never be blocked.
+    ALLOWED_RESOURCES = ()
+
+    # seconds to wait for consent banners when using a persistent profile
+    # (that usually remembers the consent)
+    CONSENT_TIMEOUT = 3
+
+    CAPABILITIES = Capabilities(downloads=("url", "click"))
+
+    # False if clicking download elements does more than requesting an
+    # url (e.g. asks for a password), so the url can't be sniffed
+    SNIFF = True
+
     def __init__(self, login_id, password, useragent=None, arguments=None):
         """
         plugins inheriting from SeleniumPortal can use self.webdriver for
@@ -143,19 +357,62 @@ class SeleniumWebPortal(WebPortal):
         """
         super().__init__(login_id, password, useragent, arguments)
 
+        # resource categories not to load
+        options = arguments["webdriver"]
+        blocked = set(options.get("block", ()))
+        if not options.get("load_images", True):
+            blocked.add("images")
+        self.blocked_resources = blocked - set(self.ALLOWED_RESOURCES)
+        # held while the browser's download directory is switched
+        self.download_lock = threading.Lock()
+        # persistent browser profile directory (None = private session)
+        self.profile = options.get("profile")
+        # disk cache size of persistent profile (MB)
+        self.cache_size = options.get("cache_size", 200)
+        # capture urls behind download elements (chrome only)
+        self.sniffing = bool(
+            options.get("sniff") and self.SNIFF and self.WEBDRIVER == "chrome"
+        )
+
+        # docdl.browser.SharedBrowser to use instead of an own browser
+        self.browser = options.get("browser")
+        # id of our browser context in shared browser
+        self.browser_context = None
+
+        # use isolated context of shared browser
+        if self.browser:
+            self.webdriver = self.browser.webdriver
+            self.browser_context, self.window = self.browser.create_context()
+            # new contexts don't know where to save downloads
+            self.set_download_dir(self.download_dir)
         # initialize selenium
-        webdriver_opts = self._init_webdriver_options()
-        self._init_webdriver(webdriver_opts, arguments["webdriver"])
+        else:
+            webdriver_opts = self._init_webdriver_options()
+            webdriver_opts.page_load_strategy = (
+                options.get("page_load_strategy") or self.PAGE_LOAD_STRATEGY
+            )
+            self._init_webdriver(webdriver_opts, options)
+        self._prepare_tab()
 
     def __enter__(self):
+        self.activate()
         super().__enter__()
         # copy cookies to requests session
         self.copy_to_requests_session()
         return self
 
+    def activate(self):
+        # other portals may have used the shared browser in the meantime
+        if self.browser:
+            self.webdriver.switch_to.window(self.window)
+
     def __exit__(self, exc_type, exc_val, exc_tb):
         """cleanup selenium"""
         super().__exit__(exc_type, exc_val, exc_tb)
+        # only close our context of a shared browser
+        if self.browser:
+            self.browser.dispose_context(self.browser_context)
+            return
         self.webdriver.close()
         self.webdriver.quit()
 
@@ -186,42 +443,64 @@ class SeleniumWebPortal(WebPortal):
             # pylint: disable=C0415
             from selenium.webdriver.webkitgtk.options import Options
 
+        elif self.WEBDRIVER == "fake":
+            # pylint: disable=C0415
+            from docdl.fakedriver import Options
+
         else:
             raise AttributeError('unknown webdriver: "{self.WEBDRIVER}"')
         return Options()
 
+    # pylint: disable=R0915
     def _init_webdriver(self, webdriver_options, options):
         """init selenium"""
         # pylint: disable=C0415
         from selenium import webdriver
 
+        # url of webdriver server to connect to instead of starting one
+        remote = options.get("remote")
+
+        def _start(local_webdriver):
+            """start local webdriver or new session on remote server"""
+            if remote:
+                # pylint: disable=C0415
+                from docdl.remote import connect
+
+                return connect(remote, self.WEBDRIVER, webdriver_options)
+            return local_webdriver(options=webdriver_options)
+
         def _init_chrome():
             # add prefs
             # selenium webdriver specific options
             if "headless" in options:
                 # set headless mode
                 webdriver_options.headless = options["headless"]
-            if "load_images" in options and options["load_images"]:
-                # disable image loading
-                webdriver_options.add_experimental_option(
-                    "prefs",
-                    {
-                        "profile.default_content_settings.images": 2,
-                        "profile.managed_default_content_settings.images": 2,
-                    },
+            if self.profile:
+                # keep cache, cookies and consents between runs
+                webdriver_options.add_argument(f"--user-data-dir={self.profile}")
+                webdriver_options.add_argument(
+                    f"--disk-cache-size={self.cache_size * 1024 * 1024}"
                 )
-            # enable incognito mode
-            webdriver_options.add_argument("--incognito")
-            # set preferences
-            webdriver_options.add_experimental_option(
-                "prefs",
-                {
-                    # always save PDFs
-                    "plugins.always_open_pdf_externally": True,
-                    # set default download directory to CWD
-                    "download.default_directory": os.getcwd(),
-                },
-            )
+            else:
+                # enable incognito mode
+                webdriver_options.add_argument("--incognito")
+            # log network events to sniff download urls
+            if self.sniffing:
+                webdriver_options.set_capability(
+                    "goog:loggingPrefs", {"performance": "ALL"}
+                )
+            prefs = {
+                # always save PDFs
+                "plugins.always_open_pdf_externally": True,
+                # save downloads in download directory
+                "download.default_directory": self.download_dir,
+            }
+            if "images" in self.blocked_resources:
+                # disable image loading
+                prefs["profile.default_content_settings.images"] = 2
+                prefs["profile.managed_default_content_settings.images"] = 2
+            # set preferences (only the last "prefs" option counts)
+            webdriver_options.add_experimental_option("prefs", prefs)
             # set user agent
             if self.useragent:
                 webdriver_options.add_argument(f"user-agent='{self.useragent}'")
@@ -229,11 +508,11 @@ class SeleniumWebPortal(WebPortal):
             if "debug" in options:
                 webdriver_options.add_argument("--remote-debugging-port=9222")
             # set preference options & init webdriver
-            return webdriver.Chrome(options=webdriver_options)
+            return _start(webdriver.Chrome)
 
         def _init_edge():
             # pylint: disable=E1123
-            return webdriver.Edge(options=webdriver_options)
+            return _start(webdriver.Edge)
 
         def _init_firefox():
             # pylint: disable=C0415
@@ -246,12 +525,12 @@ class SeleniumWebPortal(WebPortal):
             # ~ firefox_profile.set_preference(
             # ~     "browser.privatebrowsing.autostart", True
             # ~ )
-            # set default download directory to CWD
+            # save downloads in download directory
             firefox_profile.set_preference("browser.download.folderList", 2)
             firefox_profile.set_preference(
                 "browser.download.manager.showWhenStarting", False
             )
-            firefox_profile.set_preference("browser.download.dir", os.getcwd())
+            firefox_profile.set_preference("browser.download.dir", self.download_dir)
             # save PDFs by default (don't preview)
             firefox_profile.set_preference(
                 "browser.helperApps.neverAsk.saveToDisk", "application/pdf"
@@ -259,8 +538,17 @@ class SeleniumWebPortal(WebPortal):
             firefox_profile.set_preference("pdfjs.disabled", True)
             firefox_profile.set_preference("plugin.scan.Acrobat", "999.0")
             firefox_profile.set_preference("plugin.scan.plid.all", False)
-            # turn off image loading by default
-            firefox_profile.set_preference("permissions.default.image", 2)
+            # turn off image loading
+            if "images" in self.blocked_resources:
+                firefox_profile.set_preference("permissions.default.image", 2)
+            # limit disk cache of persistent profile
+            if self.profile:
+                firefox_profile.set_preference(
+                    "browser.cache.disk.smart_size.enabled", False
+                )
+                firefox_profile.set_preference(
+                    "browser.cache.disk.capacity", self.cache_size * 1024
+                )
             # headless mode
             if "headless" in options:
                 # set headless mode
@@ -270,6 +558,19 @@ class SeleniumWebPortal(WebPortal):
                 firefox_profile.set_preference(
                     "general.useragent.override", self.useragent
                 )
+            if self.profile:
+                # use persistent profile and apply our preferences to it
+                os.makedirs(self.profile, exist_ok=True)
+                webdriver_options.add_argument("-profile")
+                webdriver_options.add_argument(self.profile)
+                for name, value in firefox_profile.default_preferences.items():
+                    webdriver_options.set_preference(name, value)
+            else:
+                # set firefox profile
+                webdriver_options.profile = firefox_profile
+            # remote server knows its firefox
+            if remote:
+                return _start(webdriver.Firefox)
             # find binary
             if platform.machine() in ["x86_64", "s390x", "sparc64"]:
                 moz_lib_dir = "/usr/lib64"
@@ -288,22 +589,28 @@ class SeleniumWebPortal(WebPortal):
                     )
             # get path to geckodriver executable
             gecko_path = shutil.which("geckodriver")
-            # set firefox profile
-            webdriver_options.profile = firefox_profile
             # set firefox binary
             webdriver_options.binary = FirefoxBinary(os.path.join(gecko_path, ff_path))
             # initialize driver
-            return webdriver.Firefox(options=webdriver_options)
+            return _start(webdriver.Firefox)
 
         def _init_ie():
-            return webdriver.Ie(options=webdriver_options)
+            return _start(webdriver.Ie)
 
         def _init_safari():
             # pylint: disable=E1123
-            return webdriver.Safari(options=webdriver_options)
+            return _start(webdriver.Safari)
 
         def _init_webkitgtk():
-            return webdriver.WebKitGTK(options=webdriver_options)
+            return _start(webdriver.WebKitGTK)
+
+        def _init_fake():
+            # pylint: disable=C0415
+            from docdl.fakedriver import FakeWebDriver
+
+            if not options.get("snapshots"):
+                raise AttributeError("fake webdriver needs a snapshot directory")
+            return FakeWebDriver(options["snapshots"], self.useragent)
 
         # webdriver registry
         webdrivers = {
@@ -313,11 +620,36 @@ class SeleniumWebPortal(WebPortal):
             "ie": _init_ie,
             "safari": _init_safari,
             "webkitgtk": _init_webkitgtk,
+            "fake": _init_fake,
         }
 
         # init webdriver
         self.webdriver = webdrivers[self.WEBDRIVER]()
 
+    def _prepare_tab(self):
+        """apply per tab settings to the current tab"""
+        # the user agent of a shared browser is set per tab
+        if self.browser and self.useragent:
+            self.webdriver.execute_cdp_cmd(
+                "Network.setUserAgentOverride", {"userAgent": self.useragent}
+            )
+        self.block_resources()
+
+    def block_resources(self):
+        """
+        block loading of resources in current browser tab using the
+        chrome devtools protocol (chromium based webdrivers only)
+        """
+        if not self.blocked_resources or not hasattr(self.webdriver, "execute_cdp_cmd"):
+            return
+        urls = [
+            pattern
+            for category in sorted(self.blocked_resources)
+            for pattern in RESOURCE_PATTERNS[category]
+        ]
+        self.webdriver.execute_cdp_cmd("Network.enable", {})
+        self.webdriver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": urls})
+
     def documents(self):
         """
         generator that iterates all available and yields docdl.Documents()
@@ -338,10 +670,76 @@ class SeleniumWebPortal(WebPortal):
         # don't attempt download
         else:
             return None
-        return document.rename_after_download(filename)
+        return document.rename_after_download(filename, self.download_dir)
 
     def download_with_selenium(self, document):
-        """download a file using the selenium webdriver"""
+        """
+        download a file by clicking its download element. Chromium based
+        browsers save every download into a temporary directory of its
+        own, so parallel downloads and stray files can't get mixed up.
+        """
+        # scroll to download element
+        self.scroll_to_element(document.download_element)
+        # remember how we downloaded
+        document.download_info = {"method": "selenium", "retries": 0}
+
+        # other browsers can only watch the download directory
+        if not hasattr(self.webdriver, "execute_cdp_cmd"):
+            with self.download_lock:
+                return self._download_with_watchdog(document)
+
+        tmpdir = self.start_download(document.download_element)
+        return self.finish_download(document, tmpdir)
+
+    def start_download(self, element):
+        """
+        click element and wait until the browser started the download
+        (chromium based webdrivers only)
+
+        :param element: WebElement to click in the current tab
+        :result: temporary directory the download is saved to
+        """
+        tmpdir = tempfile.mkdtemp(prefix=".document-dl-", dir=self.download_dir)
+        try:
+            # the download directory is browser wide, so only switch it
+            # until our download started
+            with self.download_lock:
+                self.set_download_dir(tmpdir)
+                try:
+                    element.click()
+                    self._wait_for_download(tmpdir, started=True)
+                finally:
+                    self.set_download_dir(self.download_dir)
+        except BaseException:
+            shutil.rmtree(tmpdir, ignore_errors=True)
+            raise
+        return tmpdir
+
+    def finish_download(self, document, tmpdir, wait=True):
+        """
+        move finished download from tmpdir to its final name
+
+        :param document: downloaded docdl.Document
+        :param tmpdir: directory returned by start_download()
+        :param wait: wait for the download to finish
+        :result: filename or None if download didn't finish, yet
+        """
+        if wait:
+            filename = self._wait_for_download(tmpdir)
+        else:
+            filename = _finished_download(tmpdir)
+            if not filename:
+                return None
+        # move to final name
+        final = document.attributes.get("filename", filename)
+        os.replace(
+            os.path.join(tmpdir, filename), os.path.join(self.download_dir, final)
+        )
+        shutil.rmtree(tmpdir, ignore_errors=True)
+        return final
+
+    def _download_with_watchdog(self, document):
+        """download by clicking and watching for new files in download_dir"""
 
         class DownloadFileCreatedHandler(watchdog.events.PatternMatchingEventHandler):
             """
@@ -353,17 +751,12 @@ class SeleniumWebPortal(WebPortal):
             def on_created(self, event):
                 self.filename = os.path.basename(event.src_path)
 
-        # scroll to download element
-        self.scroll_to_element(document.download_element)
-
         # setup download directory watchdog
         # pylint: disable=C0103
         OBSERVER = watchdog.observers.Observer()
         # ignore temporary download files
-        handler = DownloadFileCreatedHandler(
-            ignore_patterns=["*.crdownload", "*.part", ".com.google.Chrome.*"]
-        )
-        OBSERVER.schedule(handler, os.getcwd(), recursive=False)
+        handler = DownloadFileCreatedHandler(ignore_patterns=PARTIAL_DOWNLOADS)
+        OBSERVER.schedule(handler, self.download_dir, recursive=False)
 
         # click element to start download
         document.download_element.click()
@@ -371,7 +764,16 @@ class SeleniumWebPortal(WebPortal):
         # wait for download completed
         OBSERVER.start()
         try:
+            size = None
+            deadline = time.monotonic() + self.TIMEOUT
             while not handler.filename:
+                # downloads that make progress get more time
+                current = self._partial_download_size()
+                if current != size:
+                    size = current
+                    deadline = time.monotonic() + self.TIMEOUT
+                if time.monotonic() > deadline:
+                    raise DownloadError(f"download of {document} didn't finish")
                 time.sleep(0.1)
         finally:
             OBSERVER.stop()
@@ -379,6 +781,148 @@ class SeleniumWebPortal(WebPortal):
 
         return handler.filename
 
+    def _partial_download_size(self):
+        """:result: total size of unfinished downloads in download_dir"""
+        size = 0
+        for name in os.listdir(self.download_dir):
+            if any(fnmatch.fnmatch(name, pattern) for pattern in PARTIAL_DOWNLOADS):
+                try:
+                    size += os.path.getsize(os.path.join(self.download_dir, name))
+                except FileNotFoundError:
+                    continue
+        return size
+
+    def _wait_for_download(self, directory, started=False):
+        """
+        wait until the browser finished downloading a file into directory.
+        Raises DownloadError if there's no progress for TIMEOUT seconds.
+
+        :param directory: directory only this download is saved in
+        :param started: only wait until the download started
+        :result: filename of finished download
+        """
+        size = None
+        deadline = time.monotonic() + self.TIMEOUT
+        while time.monotonic() < deadline:
+            names = os.listdir(directory)
+            if started and names:
+                return None
+            filename = _finished_download(directory)
+            if filename:
+                return filename
+            # downloads that make progress get more time
+            try:
+                current = sum(
+                    os.path.getsize(os.path.join(directory, name)) for name in names
+                )
+            except FileNotFoundError:
+                continue
+            if current != size:
+                size = current
+                deadline = time.monotonic() + self.TIMEOUT
+            time.sleep(0.1)
+        shutil.rmtree(directory, ignore_errors=True)
+        raise DownloadError(
+            f"download {'start' if started else 'progress'} timed out in {directory}"
+        )
+
+    def set_download_dir(self, directory):
+        """
+        let the browser save downloads to directory
+        (chromium based webdrivers only)
+        """
+        self.webdriver.execute_cdp_cmd(
+            "Browser.setDownloadBehavior",
+            {
+                "behavior": "allow",
+                "downloadPath": directory,
+                **self._browser_context_params(),
+            },
+        )
+
+    def _browser_context_params(self):
+        """:result: CDP parameters to address our context of a shared browser"""
+        if self.browser_context:
+            return {"browserContextId": self.browser_context}
+        return {}
+
+    def sniff(self, document):
+        """
+        click download element of document without downloading and turn
+        it into an url based document if the click requested a plain url
+        that can be downloaded with requests (and in parallel)
+
+        :result: True if document was turned into an url based document
+        """
+        if not self.sniffing or not document.download_element or document.url:
+            return False
+        # forget earlier events
+        self.webdriver.get_log("performance")
+        self.scroll_to_element(document.download_element)
+        # the download directory is browser wide
+        with self.download_lock:
+            self.webdriver.execute_cdp_cmd(
+                "Browser.setDownloadBehavior",
+                {
+                    "behavior": "deny",
+                    "eventsEnabled": True,
+                    **self._browser_context_params(),
+                },
+            )
+            try:
+                document.download_element.click()
+                request = self._sniff_request()
+            finally:
+                self.set_download_dir(self.download_dir)
+        if not request:
+            # don't waste time on downloads that can't be sniffed
+            self.sniffing = False
+            return False
+        document.url = request["url"]
+        document.request_headers = {
+            name: value
+            for name, value in request.get("headers", {}).items()
+            if name.lower() in SNIFF_HEADERS
+        }
+        document.download_element = None
+        return True
+
+    def _sniff_request(self):
+        """
+        :result: request (CDP Network.Request dict) that started a
+                 download or None
+        """
+        # requests sent by the browser (requestId -> request)
+        sent = {}
+        deadline = time.monotonic() + self.TIMEOUT
+        while time.monotonic() < deadline:
+            for entry in self.webdriver.get_log("performance"):
+                message = json.loads(entry["message"])["message"]
+                params = message.get("params", {})
+                if message["method"] == "Network.requestWillBeSent":
+                    sent[params["requestId"]] = params["request"]
+                elif message["method"] in (
+                    "Browser.downloadWillBegin",
+                    "Page.downloadWillBegin",
+                ):
+                    url = params["url"]
+                    request = next(
+                        (
+                            request
+                            for request in reversed(sent.values())
+                            if request["url"] == url
+                        ),
+                        {"url": url, "method": "GET"},
+                    )
+                    # only plain GET requests can be repeated (no blob: urls)
+                    if request["method"] != "GET" or not url.startswith(
+                        ("http://", "https://")
+                    ):
+                        return None
+                    return request
+            time.sleep(0.1)
+        return None
+
     def copy_to_requests_session(self):
         """copy current selenium session to requests session"""
         # copy cookies
@@ -398,9 +942,10 @@ class SeleniumWebPortal(WebPortal):
         # scroll to ensure captcha is visible
         self.scroll_to_element(image)
         # save screenshot
-        image.screenshot("captcha.png")
+        filename = os.path.join(self.download_dir, "captcha.png")
+        image.screenshot(filename)
         # present image to the user
-        docdl.util.show_image(os.path.join(os.getcwd(), "captcha.png"), "captcha")
+        docdl.util.show_image(filename, "captcha")
         # ask for interactive captcha input
         sys.stderr.write(prompt)
         sys.stderr.flush()
@@ -408,6 +953,63 @@ class SeleniumWebPortal(WebPortal):
         # enter into field
         entry.send_keys(captcha)
 
+    def get(self, url):
+        """load url in browser (rate limited)"""
+        self.ratelimiter.acquire(url)
+        self.webdriver.get(url)
+
+    def dismiss(self, locator, driver=None):
+        """
+        click element (e.g. of a consent banner) if it shows up. Persistent
+        profiles remember consents, so only wait CONSENT_TIMEOUT seconds
+        for it then.
+
+        :param locator: (By, value) tuple of element or expected condition
+                        that returns the element
+        :param driver: webdriver or WebElement to search in
+        :result: True if element was clicked
+        """
+        condition = (
+            locator if callable(locator) else EC.element_to_be_clickable(locator)
+        )
+        timeout = self.CONSENT_TIMEOUT if self.profile else self.TIMEOUT
+        try:
+            self.wait(driver, timeout).until(condition).click()
+        except TimeoutException:
+            return False
+        return True
+
+    def new_tab(self):
+        """
+        open new tab in our browser (context) and switch to it
+
+        :result: window handle
+        """
+        if self.browser:
+            self.browser.create_tab(self.browser_context)
+        else:
+            self.webdriver.switch_to.new_window("tab")
+        self._prepare_tab()
+        return self.webdriver.current_window_handle
+
+    def relocate_element(self, locator, load):
+        """
+        find element in current tab. If it's not there, load the page that
+        contains it first (use in Document.relocate callables)
+
+        :param locator: (By, value) tuple of element
+        :param load: url or callable that loads the page with the element
+        :result: WebElement
+        """
+        try:
+            return self.webdriver.find_element(*locator)
+        except NoSuchElementException:
+            if callable(load):
+                load()
+            else:
+                self.get(load)
+        return self.wait().until(EC.presence_of_element_located(locator))
+
     def scroll_to_element(self, element):
         """scroll WebElement into center view"""
         self.webdriver.execute_script(
@@ -419,9 +1021,22 @@ class SeleniumWebPortal(WebPortal):
         """scroll to bottom of page"""
         self.webdriver.execute_script("window.scrollTo(0, document.body.scrollHeight)")
 
+    def wait(self, driver=None, timeout=None):
+        """
+        :param driver: webdriver or WebElement to wait on
+                       (default: self.webdriver)
+        :param timeout: seconds to wait (default: self.TIMEOUT)
+        :result: WebDriverWait with configured timeout and poll frequency
+        """
+        return WebDriverWait(
+            self.webdriver if driver is None else driver,
+            self.TIMEOUT if timeout is None else timeout,
+            poll_frequency=self.POLL_FREQUENCY,
+        )
+
     def wait_for_urlchange(self, current_url):
         """wait until current URL changes"""
-        WebDriverWait(self.webdriver, self.TIMEOUT).until(EC.url_changes(current_url))
+        self.wait().until(EC.url_changes(current_url))
         # return new url
         return self.webdriver.current_url
 
@@ -429,8 +1044,15 @@ class SeleniumWebPortal(WebPortal):
 class Document:
     """a document"""
 
+    # pylint: disable=R0913,R0917
     def __init__(
-        self, url=None, attributes=None, request_headers=None, download_element=None
+        self,
+        url=None,
+        attributes=None,
+        request_headers=None,
+        download_element=None,
+        relocate=None,
+        resolvers=None,
     ):
         # default custom request headers
         if request_headers is None:
@@ -444,25 +1066,85 @@ class Document:
         if attributes is None:
             attributes = {}
         self.attributes = attributes
+        # set by the portal while downloading (method, retries)
+        self.download_info = {}
+        # path of downloaded file
+        self.path = None
+        # callable that finds download_element again in another browser
+        # tab showing any page of the portal (for parallel downloads)
+        self.relocate = relocate
+        # attribute name: callable(document) that sets expensive attributes
+        # (and url) only when they are needed (see resolve())
+        self.resolvers = resolvers or {}
 
     def __repr__(self):
         return f'class {self.__class__.__name__}(url="{self.url}", attributes={self.attributes})'
 
-    def rename_after_download(self, filename):
+    def resolve(self, names=None):
+        """
+        compute lazy attributes. A resolver registered for several
+        attributes is called once.
+
+        :param names: attribute names that are needed (None = all)
+        """
+        for name in list(self.resolvers):
+            if names is not None and name not in names:
+                continue
+            resolver = self.resolvers.pop(name, None)
+            if not resolver:
+                continue
+            # forget other attributes set by the same resolver
+            self.resolvers = {
+                other: function
+                for other, function in self.resolvers.items()
+                if function is not resolver
+            }
+            resolver(self)
+
+    def rename_after_download(self, filename, download_dir=None):
         """
         called after file was downloaded - checks if there's a filename
         the newly downloaded file should be renamed to. Rename file if
         so.
+
+        :param filename: name of downloaded file
+        :param download_dir: directory the file was downloaded to
+                             (default: current directory)
         """
+        download_dir = download_dir or os.getcwd()
         # got a predefined filename?
         if "filename" in self.attributes:
             # rename file to predefined name
-            os.rename(filename, self.attributes["filename"])
+            os.rename(
+                os.path.join(download_dir, filename),
+                os.path.join(download_dir, self.attributes["filename"]),
+            )
         else:
             # save new filename
             self.attributes["filename"] = filename
+        self.path = os.path.join(download_dir, self.attributes["filename"])
         return filename
 
+    def add_download_stats(self, duration):
+        """
+        add measured statistics of the finished download to the
+        "download" attribute
+
+        :param duration: seconds the download took
+        """
+        size = os.path.getsize(self.path)
+        self.attributes["download"] = {
+            "bytes": size,
+            "duration_ms": round(duration * 1000),
+            "bytes_per_second": round(size / duration) if duration else None,
+            "method": self.download_info.get("method"),
+            "retries": self.download_info.get("retries", 0),
+            "sha256": docdl.util.hash_file(self.path),
+        }
+        # browser tab that downloaded the document
+        if "tab" in self.download_info:
+            self.attributes["download"]["tab"] = self.download_info["tab"]
+
     def match_string(self, filters):
         """
         :param filters: list of (attribute_name, pattern) tuples
@@ -472,7 +1154,10 @@ class Document:
 
         def _filter_attr(attribute, pattern):
             """apply filter to an attribute of a document"""
-            return str(pattern) in str(self.attributes[attribute])
+            self.resolve((attribute,))
+            # missing attributes never match
+            value = self.attributes.get(attribute)
+            return value is not None and str(pattern) in str(value)
 
         # null filter match by default
         if len(filters) == 0:
@@ -490,6 +1175,8 @@ class Document:
         # null expression matches by default
         if len(jq_strings) == 0:
             return True
+        # jq may read any attribute
+        self.resolve()
 
         # all jq expressions must produce output
         # false positive - pylint: disable=R1729
@@ -500,6 +1187,13 @@ class Document:
             ]
         )
 
+    def match_filter(self, filters):
+        """
+        :param filters: list of compiled docdl.filter.Filter expressions
+        :result: True if all filters match, False otherwise
+        """
+        return all(match(LazyAttributes(self)) for match in filters)
+
     def match_regex(self, regexes):
         """
         :param regexes: list of (attribute, regex) tuples
@@ -508,7 +1202,10 @@ class Document:
         """
 
         def _match_attr(attribute, regex):
-            return re.match(regex, str(self.attributes[attribute]))
+            self.resolve((attribute,))
+            # missing attributes never match
+            value = self.attributes.get(attribute)
+            return value is not None and re.match(regex, str(value))
 
         # always match if there are no regexes
         if len(regexes) == 0:
@@ -522,3 +1219,25 @@ class Document:
         return json.dumps(
             self.attributes, sort_keys=True, cls=docdl.util.dateparser.DateEncoder
         )
+
+
+class LazyAttributes(collections.abc.Mapping):
+    """read only view of document attributes that resolves lazy ones on access"""
+
+    def __init__(self, document):
+        """
+        :param document: docdl.Document
+        """
+        self.document = document
+
+    def __getitem__(self, name):
+        self.document.resolve((name,))
+        return self.document.attributes[name]
+
+    def __iter__(self):
+        self.document.resolve()
+        return iter(self.document.attributes)
+
+    def __len__(self):
+        self.document.resolve()
+        return len(self.document.attributes)
@@ -0,0 +1,297 @@
+"""
+local HTTP API (document-dl api) that answers from cached listings and
+runs download jobs in the background
+
+    GET  /accounts                      configured plugins and accounts
+    GET  /documents/PLUGIN/ACCOUNT      cached listing (?refresh=1 to update)
+    POST /downloads/PLUGIN/ACCOUNT      start download job, json body
+                                        (optional) with filters, see
+                                        ALLOWED_PARAMS:
+                                        {"params": {"jq_matches": [...]}}
+    GET  /jobs                          all jobs
+    GET  /jobs/ID                       job status and documents
+
+Listings older than the TTL (or missing) get refreshed by a list job in
+the background, the stale listing is returned meanwhile (HTTP 202).
+Accounts are configured like jobs of document-dl serve (docdl.serve).
+
+The API has no authentication, only bind it to trusted interfaces.
+"""
+
+import concurrent.futures
+import http.server
+import itertools
+import json
+import threading
+import time
+import urllib.parse
+
+import click
+
+import docdl.serve
+
+# root parameters API requests may set (anything else could e.g. write
+# files to arbitrary paths)
+ALLOWED_PARAMS = ("string_matches", "regex_matches", "jq_matches", "filter_expressions")
+# finished jobs to remember
+MAX_JOBS = 1000
+
+
+# pylint: disable=R0902,R0903
+class Task:
+    """list or download run of an account triggered via the API"""
+
+    def __init__(self, task_id, job, action, params):
+        """
+        :param task_id: id of this task
+        :param job: docdl.serve.Job of the account
+        :param action: "list" or "download"
+        :param params: override root parameters
+        """
+        self.id = task_id
+        self.job = job
+        self.action = action
+        self.params = params
+        self.state = "queued"
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.documents = []
+
+    def status(self, documents=True):
+        """:result: dict for json output"""
+        status = {
+            "id": self.id,
+            "plugin": self.job.plugin,
+            "account": self.job.account,
+            "action": self.action,
+            "state": self.state,
+            "error": self.error,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+        }
+        if documents:
+            status["documents"] = self.documents
+        return status
+
+
+class API:
+    """cached listings and background jobs of configured accounts"""
+
+    # pylint: disable=R0913,R0917
+    def __init__(self, ctx, jobs, ttl=3600, max_jobs=1, browser=None):
+        """
+        :param ctx: click context of the document-dl group
+        :param jobs: list of docdl.serve.Job (one per account)
+        :param ttl: seconds a cached listing stays fresh
+        :param max_jobs: maximum number of jobs running at once
+        :param browser: docdl.browser.SharedBrowser for selenium plugins
+        """
+        self.ctx = ctx
+        self.accounts = {(job.plugin, job.account): job for job in jobs}
+        self.ttl = ttl
+        self.browser = browser
+        self.pool = concurrent.futures.ThreadPoolExecutor(max_jobs)
+        self.lock = threading.RLock()
+        self.ids = itertools.count(1)
+        # task id: Task
+        self.tasks = {}
+        # (plugin, account): (time, list of documents)
+        self.listings = {}
+        # (plugin, account): Task refreshing the listing
+        self.refreshing = {}
+
+    def close(self):
+        """wait for running jobs and logout"""
+        self.pool.shutdown(wait=True, cancel_futures=True)
+        for job in self.accounts.values():
+            job.session.close()
+
+    def account(self, plugin, account):
+        """:result: docdl.serve.Job of account or None"""
+        return self.accounts.get((plugin, account))
+
+    def submit(self, job, action, params=None):
+        """
+        start job in background
+
+        :result: Task
+        """
+        forbidden = set(params or {}) - set(ALLOWED_PARAMS)
+        if forbidden:
+            raise ValueError(f"params can't be set: {', '.join(sorted(forbidden))}")
+        with self.lock:
+            task = Task(str(next(self.ids)), job, action, params or {})
+            self.tasks[task.id] = task
+            # forget oldest finished tasks
+            finished = [t for t in self.tasks.values() if t.finished]
+            for old in finished[: max(0, len(self.tasks) - MAX_JOBS)]:
+                del self.tasks[old.id]
+        self.pool.submit(self._execute, task)
+        return task
+
+    def _execute(self, task):
+        task.state = "running"
+        task.started = time.time()
+        try:
+            task.job.execute(
+                self.ctx,
+                self.browser,
+                params={
+                    **task.params,
+                    "action": task.action,
+                    "output_format": "dicts",
+                },
+                sink=lambda document: task.documents.append(
+                    json.loads(document.toJSON())
+                ),
+            )
+        # report failed jobs to API clients
+        except Exception as error:  # pylint: disable=W0718
+            task.state = "failed"
+            task.error = repr(error)
+        else:
+            task.state = "done"
+            if task.action == "list":
+                self.listings[(task.job.plugin, task.job.account)] = (
+                    time.time(),
+                    task.documents,
+                )
+        finally:
+            task.finished = time.time()
+
+    def listing(self, job, refresh=False):
+        """
+        cached listing of account, refresh it in background when it's
+        older than ttl
+
+        :result: (fresh, updated, documents, refreshing Task or None)
+        """
+        key = (job.plugin, job.account)
+        updated, documents = self.listings.get(key, (None, None))
+        fresh = updated is not None and time.time() - updated < self.ttl
+        task = None
+        if refresh or not fresh:
+            with self.lock:
+                task = self.refreshing.get(key)
+                if not task or task.finished:
+                    task = self.refreshing[key] = self.submit(job, "list")
+        return fresh and not refresh, updated, documents, task
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    """json HTTP interface of API"""
+
+    # set by serve_http()
+    api = None
+
+    def log_message(self, format, *args):  # pylint: disable=W0622
+        click.echo(f"{self.address_string()} {format % args}", err=True)
+
+    def reply(self, status, result):
+        """send json response"""
+        body = json.dumps(result).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def route(self):
+        """:result: (path segments, query dict)"""
+        url = urllib.parse.urlsplit(self.path)
+        path = [urllib.parse.unquote(part) for part in url.path.split("/") if part]
+        return path, urllib.parse.parse_qs(url.query)
+
+    def do_GET(self):  # pylint: disable=C0103
+        """answer queries"""
+        path, query = self.route()
+        if path == ["accounts"]:
+            self.reply(
+                200,
+                [
+                    {"plugin": plugin, "account": account}
+                    for plugin, account in self.api.accounts
+                ],
+            )
+        elif len(path) == 3 and path[0] == "documents":
+            job = self.api.account(path[1], path[2])
+            if not job:
+                self.reply(404, {"error": "unknown account"})
+                return
+            refresh = query.get("refresh", ["0"])[0] not in ("0", "")
+            fresh, updated, documents, task = self.api.listing(job, refresh)
+            self.reply(
+                200 if fresh else 202,
+                {
+                    "updated": updated,
+                    "documents": documents,
+                    "job": task.status(documents=False) if task else None,
+                },
+            )
+        elif path == ["jobs"]:
+            # workers add and prune tasks meanwhile
+            with self.api.lock:
+                tasks = list(self.api.tasks.values())
+            self.reply(200, [task.status(documents=False) for task in tasks])
+        elif len(path) == 2 and path[0] == "jobs" and (task := self._task(path[1])):
+            self.reply(200, task.status())
+        else:
+            self.reply(404, {"error": "not found"})
+
+    def _task(self, task_id):
+        """:result: Task or None"""
+        with self.api.lock:
+            return self.api.tasks.get(task_id)
+
+    def do_POST(self):  # pylint: disable=C0103
+        """start download jobs"""
+        path, _ = self.route()
+        if len(path) != 3 or path[0] != "downloads":
+            self.reply(404, {"error": "not found"})
+            return
+        job = self.api.account(path[1], path[2])
+        if not job:
+            self.reply(404, {"error": "unknown account"})
+            return
+        # browsers send cross origin form posts without asking first,
+        # but not json
+        content_type = self.headers.get("Content-Type", "").split(";")[0].strip()
+        if content_type.lower() != "application/json":
+            self.reply(415, {"error": "Content-Type must be application/json"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            body = json.loads(self.rfile.read(length) or b"{}")
+            task = self.api.submit(job, "download", body.get("params"))
+        except (ValueError, AttributeError) as error:
+            self.reply(400, {"error": str(error)})
+            return
+        self.reply(202, task.status(documents=False))
+
+
+def serve_http(api, bind):
+    """
+    answer HTTP requests until interrupted
+
+    :param api: API
+    :param bind: "host:port" to listen on
+    """
+    host, _, port = bind.rpartition(":")
+    handler = type("APIHandler", (Handler,), {"api": api})
+    with http.server.ThreadingHTTPServer(
+        (host or "127.0.0.1", int(port)), handler
+    ) as server:
+        click.echo(f"listening on http://{host or '127.0.0.1'}:{port}", err=True)
+        server.serve_forever()
+
+
+def load(ctx, filename, ttl, max_jobs=None, browser=None):
+    """
+    :param filename: json file with accounts like a document-dl serve schedule
+    :result: API
+    """
+    scheduler = docdl.serve.Scheduler.load(ctx, filename, max_jobs, browser)
+    return API(ctx, scheduler.jobs, ttl, scheduler.max_jobs, browser)
@@ -0,0 +1,100 @@
+"""
+one browser shared by several portals, each in an isolated browser
+context with its own cookies, storage and cache (chromium only)
+"""
+
+import threading
+
+import docdl
+
+
+class SharedBrowser:
+    """
+    browser (webdriver session) that hosts an isolated browser context
+    per SeleniumWebPortal. Pass it as arguments["webdriver"]["browser"].
+
+    All portals drive the same webdriver session, so they have to take
+    turns: hold lock while using a portal.
+    """
+
+    def __init__(self, webdriver):
+        """
+        :param webdriver: chromium based selenium webdriver
+        """
+        if not hasattr(webdriver, "execute_cdp_cmd"):
+            raise AttributeError("shared browsers need a chromium based webdriver")
+        self.webdriver = webdriver
+        # window of the default context (never closed)
+        self.main = webdriver.current_window_handle
+        self.lock = threading.RLock()
+
+    @classmethod
+    def launch(cls, options):
+        """
+        start a browser with SeleniumWebPortal.WEBDRIVER. Its page load
+        strategy applies to all contexts (PAGE_LOAD_STRATEGY of portals
+        is ignored).
+
+        :param options: webdriver options (see arguments["webdriver"])
+        :result: SharedBrowser
+        """
+        # browser wide image settings would apply to all contexts, portals
+        # block resources in their own tabs
+        options = {**options, "load_images": True, "block": ()}
+        host = docdl.SeleniumWebPortal(
+            login_id=None, password=None, arguments={"webdriver": options}
+        )
+        return cls(host.webdriver)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.quit()
+
+    def create_context(self):
+        """
+        create browser context with a blank tab and switch to it
+
+        :result: (browser context id, window handle) tuple
+        """
+        with self.lock:
+            # run browser wide commands in the default context, contexts
+            # are disposed explicitly by dispose_context()
+            self.webdriver.switch_to.window(self.main)
+            context = self.webdriver.execute_cdp_cmd("Target.createBrowserContext", {})[
+                "browserContextId"
+            ]
+            return context, self.create_tab(context)
+
+    def create_tab(self, context):
+        """
+        open blank tab in browser context and switch to it
+
+        :result: window handle
+        """
+        with self.lock:
+            target = self.webdriver.execute_cdp_cmd(
+                "Target.createTarget",
+                {"url": "about:blank", "browserContextId": context},
+            )["targetId"]
+            # chromedriver window handles contain the target id
+            handle = next(
+                handle
+                for handle in self.webdriver.window_handles
+                if handle.endswith(target)
+            )
+            self.webdriver.switch_to.window(handle)
+            return handle
+
+    def dispose_context(self, context):
+        """close all tabs of browser context and forget its data"""
+        with self.lock:
+            self.webdriver.switch_to.window(self.main)
+            self.webdriver.execute_cdp_cmd(
+                "Target.disposeBrowserContext", {"browserContextId": context}
+            )
+
+    def quit(self):
+        """close browser"""
+        self.webdriver.quit()
@@ -0,0 +1,162 @@
+"""
+record HTTP traffic of a requests session to a cassette file and replay
+it later without network access (e.g. to benchmark plugins offline)
+
+Only the requests session is recorded and replayed. Selenium based
+plugins can only replay together with --browser fake (HTML snapshots),
+otherwise they would still use the live portal.
+
+beware: cassettes contain the responses of the portal including
+session cookies and personal documents
+"""
+
+import base64
+import collections
+import http.client
+import io
+import json
+
+import requests
+import requests.adapters
+import urllib3
+
+import docdl.util
+
+
+class Cassette:
+    """recorded HTTP interactions"""
+
+    def __init__(self, filename):
+        """
+        :param filename: path of cassette file
+        """
+        self.filename = filename
+        # list of recorded interactions
+        self.interactions = []
+
+    def load(self):
+        """load interactions from file"""
+        with open(self.filename, encoding="utf-8") as file:
+            self.interactions = json.load(file)
+        return self
+
+    def save(self):
+        """atomically write interactions to file"""
+        docdl.util.atomic_write(self.filename, json.dumps(self.interactions, indent=1))
+
+    def record(self, request, response):
+        """add request/response to cassette"""
+        self.interactions += [
+            {
+                # request headers and bodies contain credentials, so we
+                # only store what's needed to match a request
+                "method": request.method,
+                "url": request.url,
+                "status": response.status_code,
+                "reason": response.reason,
+                # list of (name, value), there can be several Set-Cookie
+                "headers": list(response.raw.headers.items()),
+                # reads whole (streamed) body, it's cached in response
+                "body": base64.b64encode(response.content).decode("ascii"),
+            }
+        ]
+
+    def attach_recorder(self, session):
+        """record all traffic of requests session"""
+        for prefix, adapter in list(session.adapters.items()):
+            session.mount(prefix, RecordingAdapter(adapter, self))
+
+    def attach_player(self, session):
+        """serve all requests of requests session from this cassette"""
+        adapter = ReplayAdapter(self)
+        for prefix in list(session.adapters):
+            session.mount(prefix, adapter)
+
+
+class RecordingAdapter(requests.adapters.BaseAdapter):
+    """transport adapter that records traffic of another adapter"""
+
+    def __init__(self, adapter, cassette):
+        """
+        :param adapter: requests transport adapter doing the actual work
+        :param cassette: Cassette to record to
+        """
+        super().__init__()
+        self.adapter = adapter
+        self.cassette = cassette
+
+    # pylint: disable=R0913,R0917
+    def send(
+        self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None
+    ):
+        response = self.adapter.send(request, stream, timeout, verify, cert, proxies)
+        self.cassette.record(request, response)
+        return response
+
+    def close(self):
+        self.adapter.close()
+
+
+# pylint: disable=R0903
+class RecordedResponse:
+    """
+    stands in for the http.client response of urllib3 responses, requests
+    reads cookies (all Set-Cookie headers) from it
+    """
+
+    def __init__(self, headers):
+        """
+        :param headers: list of (name, value) tuples
+        """
+        self.msg = http.client.HTTPMessage()
+        for name, value in headers:
+            self.msg[name] = value
+
+    def isclosed(self):
+        """:result: True, there's no connection"""
+        return True
+
+
+class ReplayAdapter(requests.adapters.HTTPAdapter):
+    """transport adapter that answers requests from a cassette"""
+
+    def __init__(self, cassette):
+        """
+        :param cassette: Cassette to replay
+        """
+        super().__init__()
+        # recorded responses per (method, url) in recorded order
+        self.responses = collections.defaultdict(list)
+        for interaction in cassette.interactions:
+            key = (interaction["method"], interaction["url"])
+            self.responses[key] += [interaction]
+
+    # pylint: disable=R0913,R0917,W0613
+    def send(
+        self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None
+    ):
+        responses = self.responses.get((request.method, request.url))
+        if not responses:
+            raise requests.ConnectionError(
+                f"no recorded response for {request.method} {request.url}",
+                request=request,
+            )
+        # replay in recorded order, repeat last response
+        interaction = responses.pop(0) if len(responses) > 1 else responses[0]
+        body = base64.b64decode(interaction["body"])
+        # recorded body is already decoded
+        headers = [
+            (name, value)
+            for name, value in interaction["headers"]
+            if name.lower() not in ("content-encoding", "content-length")
+        ]
+        headers += [("Content-Length", str(len(body)))]
+        raw = urllib3.HTTPResponse(
+            body=io.BytesIO(body),
+            headers=headers,
+            status=interaction["status"],
+            reason=interaction["reason"],
+            preload_content=False,
+            original_response=RecordedResponse(headers),
+        )
+        return self.build_response(request, raw)
@@ -0,0 +1,50 @@
+"""persist resumable enumeration cursors of interrupted runs"""
+
+import json
+import os
+
+import docdl.util
+
+
+class Checkpoint:
+    """checkpoint file holding the last cursor a portal reported"""
+
+    def __init__(self, filename, persist=True):
+        """
+        :param filename: path of checkpoint file
+        :param persist: write every cursor to the file right away, else
+                        only when the run gets interrupted
+        """
+        self.filename = filename
+        self.persist = persist
+        # last reported cursor
+        self.cursor = None
+
+    def load(self):
+        """:result: last saved cursor or {} if there is none"""
+        try:
+            with open(self.filename, encoding="utf-8") as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return {}
+
+    def save(self, cursor):
+        """remember cursor, atomically write it if persist is set"""
+        self.cursor = cursor
+        if self.persist:
+            self._write()
+
+    def interrupted(self):
+        """write last cursor of an interrupted run"""
+        if self.cursor is not None and not self.persist:
+            self._write()
+
+    def _write(self):
+        docdl.util.atomic_write(self.filename, json.dumps(self.cursor, sort_keys=True))
+
+    def clear(self):
+        """remove checkpoint (run finished)"""
+        try:
+            os.remove(self.filename)
+        except FileNotFoundError:
+            pass
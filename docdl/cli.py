@@ -1,9 +1,37 @@
 """download documents from web portals"""
 
+# pylint: disable=C0302
+
+import contextlib
+import datetime
+import functools
 import importlib.metadata
+import itertools
+import os
+import time
 import click
 import click_plugins
+from slugify import slugify
 import docdl
+import docdl.cassette
+import docdl.checkpoint
+import docdl.engine
+import docdl.filter
+import docdl.index
+import docdl.metrics
+
+# download tabs of --engine auto
+AUTO_TABS = 2
+
+
+def _check_filters(ctx, param, value):  # pylint: disable=W0613
+    """parse filter expressions early to report syntax errors"""
+    for expression in value:
+        try:
+            docdl.filter.Filter(expression)
+        except docdl.filter.FilterError as error:
+            raise click.BadParameter(str(error)) from error
+    return value
 
 
 @click_plugins.with_plugins(importlib.metadata.entry_points(group="docdl_plugins"))
@@ -13,14 +41,14 @@ import docdl
         "auto_envvar_prefix": "DOCDL",
     }
 )
-@click.option("-u", "--username", prompt=True, show_envvar=True, help="login id")
+@click.option(
+    "-u", "--username", show_envvar=True, help="login id (prompted if missing)"
+)
 @click.option(
     "-p",
     "--password",
-    prompt=True,
-    hide_input=True,
     show_envvar=True,
-    help="secret password",
+    help="secret password (prompted if missing)",
 )
 @click.option(
     "-m",
@@ -52,6 +80,17 @@ import docdl
     help="only output documents if json query matches document's "
     "attributes (see https://stedolan.github.io/jq/manual/ )",
 )
+@click.option(
+    "-e",
+    "--filter",
+    "filter_expressions",
+    metavar="EXPRESSION",
+    multiple=True,
+    callback=_check_filters,
+    show_envvar=True,
+    help="only output documents matching filter expression, "
+    "e.g. 'date >= 2023-01-01 and amount > 10' (see docdl.filter)",
+)
 @click.option(
     "--headless/--show",
     "-H/ ",
@@ -65,11 +104,45 @@ import docdl
     "-b",
     "--browser",
     type=click.Choice(
-        ["chrome", "edge", "firefox", "ie", "safari", "webkitgtk"], case_sensitive=False
+        ["chrome", "edge", "firefox", "ie", "safari", "webkitgtk", "fake"],
+        case_sensitive=False,
     ),
     show_envvar=True,
     default="chrome",
-    help="webdriver to use for selenium based plugins",
+    help="webdriver to use for selenium based plugins "
+    '("fake" serves HTML snapshots, see --snapshots)',
+    show_default=True,
+)
+@click.option(
+    "--snapshots",
+    type=click.Path(file_okay=False, exists=True),
+    show_envvar=True,
+    default=None,
+    help="directory with HTML snapshots and index.json for --browser fake",
+)
+@click.option(
+    "--remote",
+    metavar="URL",
+    show_envvar=True,
+    default=None,
+    help="start browser sessions on this running webdriver server "
+    "(e.g. http://localhost:4444 for selenium standalone) instead of "
+    "launching a browser",
+)
+@click.option(
+    "--profile-dir",
+    type=click.Path(file_okay=False, writable=True),
+    show_envvar=True,
+    default=None,
+    help="keep browser profiles (cache, cookies, consents) per plugin and "
+    "account in this directory instead of using private sessions",
+)
+@click.option(
+    "--cache-size",
+    type=click.IntRange(min=0),
+    default=200,
+    show_envvar=True,
+    help="disk cache size of persistent browser profiles (MB)",
     show_default=True,
 )
 @click.option(
@@ -81,6 +154,56 @@ import docdl
     help="seconds to wait for data before terminating connection",
     show_default=True,
 )
+@click.option(
+    "--connect-timeout",
+    type=int,
+    default=10,
+    show_envvar=True,
+    help="seconds to wait for connection before giving up",
+    show_default=True,
+)
+@click.option(
+    "--retries",
+    type=int,
+    default=3,
+    show_envvar=True,
+    help="retry failed requests (with backoff) this many times",
+    show_default=True,
+)
+@click.option(
+    "--rate",
+    type=float,
+    default=5,
+    show_envvar=True,
+    help="maximum requests per second and host (0 = unlimited). "
+    "Slows down automatically when the server asks to.",
+    show_default=True,
+)
+@click.option(
+    "--burst",
+    type=int,
+    default=10,
+    show_envvar=True,
+    help="requests per host that may be sent at once",
+    show_default=True,
+)
+@click.option(
+    "-P",
+    "--page-load-strategy",
+    type=click.Choice(["normal", "eager", "none"], case_sensitive=False),
+    show_envvar=True,
+    default=None,
+    help="wait for full page load (normal), DOMContentLoaded (eager) or "
+    "don't wait (none) when opening pages  [default: plugin specific]",
+)
+@click.option(
+    "--poll-frequency",
+    type=float,
+    default=0.2,
+    show_envvar=True,
+    help="seconds between checks while waiting for page elements",
+    show_default=True,
+)
 @click.option(
     "-i",
     "--image-loading",
@@ -90,6 +213,54 @@ import docdl
     help="Turn off image loading when False",
     show_default=True,
 )
+@click.option(
+    "-B",
+    "--block",
+    type=click.Choice(sorted(docdl.RESOURCE_PATTERNS), case_sensitive=False),
+    multiple=True,
+    default=["fonts", "media", "trackers"],
+    show_envvar=True,
+    help="resources the browser shouldn't load (chrome/edge only, "
+    "plugins may still load resources they need)",
+    show_default=True,
+)
+@click.option(
+    "-E",
+    "--engine",
+    type=click.Choice(["auto", "sync", "threads"], case_sensitive=False),
+    default="sync",
+    show_envvar=True,
+    help="download documents one after another (sync), concurrently "
+    "in background threads (threads) or as the plugin allows (auto)",
+    show_default=True,
+)
+@click.option(
+    "-c",
+    "--concurrency",
+    type=click.IntRange(min=1),
+    default=4,
+    show_envvar=True,
+    help="maximum number of parallel downloads",
+    show_default=True,
+)
+@click.option(
+    "-T",
+    "--tabs",
+    type=click.IntRange(min=0),
+    default=None,
+    show_envvar=True,
+    help="extra browser tabs to run click based downloads in parallel "
+    "(0 = download in the listing tab, chrome/edge only)  "
+    f"[default: {AUTO_TABS} with --engine auto if the plugin allows it, else 0]",
+)
+@click.option(
+    "--sniff/--no-sniff",
+    default=False,
+    show_envvar=True,
+    help="capture urls behind download buttons and download them with "
+    "requests instead of the browser (chrome only)",
+    show_default=True,
+)
 @click.option(
     "-l",
     "--list",
@@ -109,6 +280,14 @@ import docdl
     help="download documents",
     show_default=True,
 )
+@click.option(
+    "-o",
+    "--download-dir",
+    type=click.Path(file_okay=False, writable=True),
+    show_envvar=True,
+    default=None,
+    help="directory to save downloaded documents in  [default: current directory]",
+)
 @click.option(
     "-f",
     "--format",
@@ -129,8 +308,57 @@ import docdl
     help="use selenium remote debugging on port 9222",
     show_default=True,
 )
+@click.option(
+    "-M",
+    "--metrics-file",
+    type=click.Path(dir_okay=False, writable=True),
+    show_envvar=True,
+    default=None,
+    help="write prometheus textfile metrics of this run to file",
+)
+@click.option(
+    "-R",
+    "--resume",
+    is_flag=True,
+    default=False,
+    show_envvar=True,
+    help="continue an interrupted run from its last checkpoint",
+)
+@click.option(
+    "--index",
+    "index_file",
+    type=click.Path(dir_okay=False, writable=True),
+    default=None,
+    show_envvar=True,
+    help="save listed documents to sqlite index (see query command)",
+)
+@click.option(
+    "--checkpoint-file",
+    type=click.Path(dir_okay=False, writable=True),
+    show_envvar=True,
+    default=None,
+    help="file to store checkpoints of interrupted runs in  "
+    "[default: DOWNLOAD_DIR/.document-dl-PLUGIN-USERNAME.checkpoint]",
+)
+@click.option(
+    "--record",
+    "record_file",
+    type=click.Path(dir_okay=False, writable=True),
+    show_envvar=True,
+    default=None,
+    help="record HTTP traffic of requests based downloads/scraping to "
+    "cassette file (contains cookies and documents!)",
+)
+@click.option(
+    "--replay",
+    "replay_file",
+    type=click.Path(dir_okay=False, exists=True),
+    show_envvar=True,
+    default=None,
+    help="answer HTTP requests from cassette file instead of network",
+)
 @click.pass_context
-# pylint: disable=W0613,C0103,R0913,R0917
+# pylint: disable=W0613,C0103,R0913,R0914,R0917
 def documentdl(
     ctx,
     username,
@@ -138,69 +366,643 @@ def documentdl(
     string_matches,
     regex_matches,
     jq_matches,
+    filter_expressions,
     headless,
     browser,
+    snapshots,
+    remote,
+    profile_dir,
+    cache_size,
     timeout,
+    connect_timeout,
+    retries,
+    rate,
+    burst,
+    page_load_strategy,
+    poll_frequency,
     image_loading,
+    block,
+    engine,
+    concurrency,
+    tabs,
+    sniff,
     action,
+    download_dir,
     output_format,
     debug,
+    metrics_file,
+    resume,
+    index_file,
+    checkpoint_file,
+    record_file,
+    replay_file,
 ):
     """download documents from web portals"""
+    if record_file and replay_file:
+        raise click.UsageError("--record and --replay are mutually exclusive")
+    if browser == "fake" and not snapshots:
+        raise click.UsageError("--browser fake needs --snapshots")
     # set browser that SeleniumWebPortal plugins should use
     docdl.SeleniumWebPortal.WEBDRIVER = browser
     # set default request timeout
     docdl.WebPortal.TIMEOUT = timeout
+    docdl.WebPortal.CONNECT_TIMEOUT = connect_timeout
+    docdl.WebPortal.RETRIES = retries
+    # keep enough connections for parallel downloads
+    docdl.WebPortal.POOL_SIZE = max(docdl.WebPortal.POOL_SIZE, concurrency)
+    # limit request rate
+    docdl.WebPortal.RATE = rate
+    docdl.WebPortal.BURST = burst
+    # set interval to check for page elements
+    docdl.SeleniumWebPortal.POLL_FREQUENCY = poll_frequency
 
 
 def run(ctx, plugin_class):
     """this gets called by plugins with their click context"""
     # get our root context
     root_ctx = ctx.find_root()
-    root_params = root_ctx.params
+    # jobs of "document-dl serve" override root parameters
+    obj = ctx.obj or {}
+    root_params = {**root_ctx.params, **obj.get("params", {})}
     params = ctx.params
+    # cassettes only replay the requests session, not the browser
+    if (
+        root_params["replay_file"]
+        and issubclass(plugin_class, docdl.SeleniumWebPortal)
+        and plugin_class.WEBDRIVER != "fake"
+    ):
+        raise click.UsageError(
+            f"{ctx.info_name} uses a browser, --replay needs --browser fake"
+        )
+    # ask for missing credentials
+    if root_params["username"] is None:
+        root_params["username"] = click.prompt("Username")
+    if root_params["password"] is None:
+        root_params["password"] = click.prompt("Password", hide_input=True)
+    # collect metrics of this run
+    metrics = docdl.metrics.Metrics(ctx.info_name, root_params["username"])
+    # checkpoints to resume interrupted runs
+    checkpoint = docdl.checkpoint.Checkpoint(
+        root_params["checkpoint_file"]
+        or os.path.join(
+            root_params["download_dir"] or os.getcwd(),
+            f".document-dl-{ctx.info_name}-{slugify(root_params['username'])}.checkpoint",
+        ),
+        # without --resume only interrupted runs leave a checkpoint
+        persist=root_params["resume"],
+    )
+    # persistent browser profile of this plugin and account
+    profile = None
+    if root_params["profile_dir"]:
+        profile = os.path.abspath(
+            os.path.join(
+                root_params["profile_dir"],
+                f"{ctx.info_name}-{slugify(root_params['username'])}",
+            )
+        )
+
+    # portals of a shared browser have to take turns
+    browser = obj.get("browser")
+    if not issubclass(plugin_class, docdl.SeleniumWebPortal):
+        browser = None
+    # save listed documents for document-dl query
+    index = None
+    if root_params["index_file"]:
+        index = docdl.index.Index(root_params["index_file"])
+
+    try:
+        with browser.lock if browser else contextlib.nullcontext():
+            _run(
+                root_params,
+                params,
+                plugin_class,
+                metrics,
+                checkpoint,
+                profile,
+                browser,
+                obj.get("session"),
+                obj.get("sink"),
+                (
+                    functools.partial(index.add, ctx.info_name, root_params["username"])
+                    if index
+                    else None
+                ),
+            )
+    except BaseException:
+        checkpoint.interrupted()
+        metrics.finish(success=False)
+        raise
+    else:
+        metrics.finish(success=True)
+    finally:
+        if root_params["metrics_file"]:
+            metrics.write(root_params["metrics_file"])
+        if index:
+            index.close()
 
+
+# pylint: disable=R0913,R0917
+def _run(
+    root_params,
+    params,
+    plugin_class,
+    metrics,
+    checkpoint,
+    profile=None,
+    browser=None,
+    session=None,
+    sink=None,
+    index=None,
+):
+    """login, walk all documents and output/download them"""
+    # reuse portal that is still logged in from the last run
+    if session and session.portal:
+        if _reuse(root_params, session, metrics, checkpoint, sink, index):
+            checkpoint.clear()
+            return
     # initialize plugin
-    plugin = plugin_class(
-        login_id=root_params["username"],
-        password=root_params["password"],
-        arguments={
-            # set webdriver specific params
-            "webdriver": {
-                "headless": root_params["headless"],
-                "load_images": root_params["image_loading"],
+    with metrics.phase("init"):
+        plugin = plugin_class(
+            login_id=root_params["username"],
+            password=root_params["password"],
+            arguments={
+                # set webdriver specific params
+                "webdriver": {
+                    "headless": root_params["headless"],
+                    "load_images": root_params["image_loading"],
+                    "block": root_params["block"],
+                    "page_load_strategy": root_params["page_load_strategy"],
+                    "snapshots": root_params["snapshots"],
+                    "sniff": root_params["sniff"],
+                    "remote": root_params["remote"],
+                    "profile": profile,
+                    "cache_size": root_params["cache_size"],
+                    "browser": browser,
+                },
+                # save documents here
+                "download_dir": root_params["download_dir"],
+                # continue from last checkpoint
+                "resume": checkpoint.load() if root_params["resume"] else {},
+                # pass plugin params directly to plugin
+                **params,
             },
-            # pass plugin params directly to plugin
-            **params,
-        },
-    )
+        )
 
     # let's go
-    with plugin as portal:
-        # list of documents
-        result = []
+    with contextlib.ExitStack() as stack:
+        # record or replay http traffic
+        if root_params["record_file"]:
+            cassette = docdl.cassette.Cassette(root_params["record_file"])
+            cassette.attach_recorder(plugin.session)
+            stack.callback(cassette.save)
+        elif root_params["replay_file"]:
+            cassette = docdl.cassette.Cassette(root_params["replay_file"]).load()
+            cassette.attach_player(plugin.session)
+        # measure logout (callbacks are called in reverse order)
+        stack.callback(metrics.stop, "logout")
+        # login
+        with metrics.phase("login"):
+            try:
+                portal = stack.enter_context(plugin)
+            except docdl.AuthenticationError:
+                metrics.inc("login_failures")
+                raise
+        metrics.set("login_success", 1)
+        stack.callback(metrics.start, "logout")
+        _process(root_params, portal, metrics, checkpoint, sink, index)
+        # stay logged in until the next run of this job
+        if session and session.enabled(plugin_class):
+            session.keep(portal, stack.pop_all())
+    # finished successfully
+    checkpoint.clear()
+
+
+# pylint: disable=R0913,R0917
+def _reuse(root_params, session, metrics, checkpoint, sink=None, index=None):
+    """
+    walk all documents of the portal kept logged in by session
+
+    :result: False if the session expired
+    """
+    portal = session.portal
+    portal.resume = checkpoint.load() if root_params["resume"] else {}
+    # nothing was output or downloaded before the first document, so
+    # failing until then means the session expired
+    portal.on_checkpoint = checkpoint.save
+    try:
+        portal.activate()
+        listing = iter(portal.documents())
+        first = next(listing, None)
+    except Exception as error:  # pylint: disable=W0718
+        click.echo(f"session expired ({error}), logging in again", err=True)
+        session.close()
+        return False
+    metrics.set("login_success", 1)
+    documents = itertools.chain([] if first is None else [first], listing)
+    with _closing(listing):
+        _process(root_params, portal, metrics, checkpoint, sink, index, documents)
+    return True
+
+
+def _closing(documents):
+    """
+    generators of portals may clean up (e.g. close tabs) when they are
+    closed, so don't wait for the garbage collector if we stop early
+
+    :result: context manager that closes documents
+    """
+    if hasattr(documents, "close"):
+        return contextlib.closing(documents)
+    return contextlib.nullcontext(documents)
+
+
+# pylint: disable=R0913,R0917
+def _process(
+    root_params, portal, metrics, checkpoint, sink=None, index=None, documents=None
+):
+    """
+    walk all documents of logged in portal and output/download them
+
+    :param documents: documents of portal that are already being listed
+    """
+    with contextlib.ExitStack() as stack:
+        # download engines for documents with url or download element
+        engines = []
+        engine, tabs = _choose_engine(root_params, portal)
+        if root_params["action"] == "download" and engine == "threads":
+            engines += [
+                stack.enter_context(
+                    docdl.engine.ThreadEngine(portal, root_params["concurrency"])
+                )
+            ]
+        if root_params["action"] == "download" and tabs:
+            engines += [stack.enter_context(docdl.engine.TabEngine(portal, tabs))]
+        if documents is None:
+            documents = stack.enter_context(_closing(portal.documents()))
+        Run(root_params, portal, metrics, engines, checkpoint, sink, index).process(
+            documents
+        )
+
+
+def _choose_engine(root_params, portal):
+    """
+    :result: (engine, tabs) tuple, "auto" uses the capabilities of portal
+    """
+    engine, tabs = root_params["engine"], root_params["tabs"]
+    # download tabs need chromium (other drivers can't start downloads
+    # without waiting for them)
+    if not hasattr(getattr(portal, "webdriver", None), "execute_cdp_cmd"):
+        tabs = 0
+    if engine != "auto":
+        return engine, tabs or 0
+    capabilities = portal.CAPABILITIES
+    if capabilities.concurrent and "url" in capabilities.downloads:
+        engine = "threads"
+    else:
+        engine = "sync"
+    if tabs is None and capabilities.concurrent and "click" in capabilities.downloads:
+        tabs = AUTO_TABS
+    return engine, tabs or 0
+
+
+# pylint: disable=R0902
+class Run:
+    """filter, download and output documents of a logged in portal"""
+
+    # pylint: disable=R0913,R0917
+    def __init__(
+        self,
+        root_params,
+        portal,
+        metrics,
+        engines=(),
+        checkpoint=None,
+        sink=None,
+        index=None,
+    ):
+        """
+        :param root_params: parameters of the root click context
+        :param portal: logged in docdl.WebPortal
+        :param metrics: docdl.metrics.Metrics of this run
+        :param engines: docdl.engine engines for background downloads
+        :param checkpoint: docdl.checkpoint.Checkpoint to save cursors to
+        :param sink: callable that gets documents instead of stdout
+        :param index: callable that saves listed documents
+        """
+        self.root_params = root_params
+        self.sink = sink
+        self.index = index
+        # compile filter expressions once, cheap attributes first
+        cost = portal.CAPABILITIES.cost
+        self.filters = [
+            docdl.filter.Filter(expression).optimize(cost)
+            for expression in root_params["filter_expressions"]
+        ]
+        # (cost, filter stage) tuples
+        stages = [
+            (
+                cost({name for name, _ in root_params["string_matches"]}),
+                lambda document: document.match_string(root_params["string_matches"]),
+            ),
+            (
+                cost({name for name, _ in root_params["regex_matches"]}),
+                lambda document: document.match_regex(root_params["regex_matches"]),
+            ),
+            *(
+                (
+                    cost(expression.names()),
+                    lambda document, expression=expression: document.match_filter(
+                        [expression]
+                    ),
+                )
+                for expression in self.filters
+            ),
+            # jq reads all attributes
+            (
+                cost(None),
+                lambda document: document.match_jq(root_params["jq_matches"]),
+            ),
+        ]
+        # run filters on cheap attributes first
+        self.stages = [stage for _, stage in sorted(stages, key=lambda stage: stage[0])]
+        self.exhausted = self._stop_condition(portal.CAPABILITIES)
+        self.portal = portal
+        self.metrics = metrics
+        self.engines = engines
+        self.checkpoint = checkpoint
+        if checkpoint:
+            portal.on_checkpoint = self.save_checkpoint
+        # list of documents (for "list" output format)
+        self.result = []
+
+    def process(self, documents):
+        """filter, download and output all documents"""
         # walk all documents found
-        for document in portal.documents():
-            # filter document
-            filtered = (
+        for document in self.metrics.iterate("list", documents):
+            self.metrics.inc("documents_listed")
+            if self.index:
+                self.index(document)
+            # sorted listing passed the filter bounds?
+            if self.exhausted(document):
+                self.metrics.set("stopped_early", 1)
+                break
+            # skip filtered documents
+            if self.match(document):
+                self.metrics.inc("documents_matched")
+                self.handle(document)
+            # output documents downloaded in the background
+            self.collect()
+        # wait for background downloads
+        with self.metrics.phase("download"):
+            self.collect(wait=True)
+
+        # output json list?
+        if self.root_params["output_format"] == "list" and not self.sink:
+            click.echo(f"[ {','.join(self.result)} ]")
+
+    def _stop_condition(self, capabilities):
+        """
+        :result: function that returns True if neither the document nor
+                 any document listed after it can match the filters
+        """
+        if not capabilities.sort or capabilities.cost({capabilities.sort[0]}):
+            return lambda document: False
+        attribute, order = capabilities.sort
+        # descending listings end below the lower bound and vice versa
+        bounds = [
+            expression.range(attribute)[0 if order == "desc" else 1]
+            for expression in self.filters
+        ]
+        bounds = [bound for bound in bounds if bound is not None]
+
+        def exhausted(document):
+            for bound in bounds:
+                value = docdl.filter.coerce(document.attributes.get(attribute), bound)
+                if value is None:
+                    continue
+                try:
+                    if value < bound if order == "desc" else value > bound:
+                        return True
+                except TypeError:
+                    continue
+            return False
+
+        return exhausted
+
+    def save_checkpoint(self, cursor):
+        """portal reached a resumable position"""
+        # everything before the cursor must be finished
+        with self.metrics.phase("download"):
+            self.collect(wait=True)
+        self.checkpoint.save(cursor)
+
+    def match(self, document):
+        """:result: True if document passes all filters"""
+        with self.metrics.phase("filter"):
+            return all(stage(document) for stage in self.stages)
+
+    def handle(self, document):
+        """download (if requested) and output matched document"""
+        # output and download need all attributes
+        document.resolve()
+        # only list?
+        if self.root_params["action"] != "download":
+            self.output(document)
+            return
+        # capture url behind download element
+        if isinstance(self.portal, docdl.SeleniumWebPortal):
+            with self.metrics.phase("sniff"):
+                if self.portal.sniff(document):
+                    self.metrics.inc("documents_sniffed")
+        # download in background?
+        if engine := next(
+            (engine for engine in self.engines if engine.accepts(document)), None
+        ):
+            with self.metrics.phase("download"):
+                engine.submit(document)
+        # download now
+        else:
+            with self.metrics.phase("download"):
+                start = time.monotonic()
+                filename = self.portal.download(document)
+                duration = time.monotonic() - start
+            self.downloaded(document, filename, duration)
+
+    def collect(self, wait=False):
+        """output documents downloaded in the background"""
+        for engine in self.engines:
+            for document, filename, duration in engine.completed(wait):
+                self.downloaded(document, filename, duration)
+
+    def downloaded(self, document, filename, duration):
+        """add statistics to downloaded document and output it"""
+        # got a file?
+        if filename:
+            document.add_download_stats(duration)
+            self.metrics.inc("documents_downloaded")
+            self.metrics.inc(
+                "bytes_downloaded", document.attributes["download"]["bytes"]
+            )
+        self.output(document)
+
+    def output(self, document):
+        """output document"""
+        # remember resolved attributes and download statistics
+        if self.index:
+            self.index(document)
+        # caller collects documents (e.g. document-dl api)?
+        if self.sink:
+            self.sink(document)
+        # line buffered dict output?
+        elif self.root_params["output_format"] == "dicts":
+            # always output as json dict
+            click.echo(document.toJSON())
+        # just store result for later
+        else:
+            self.result += [document.toJSON()]
+
+
+@documentdl.command()
+@click.argument("schedule", type=click.Path(exists=True, dir_okay=False))
+@click.option(
+    "--max-jobs",
+    type=int,
+    default=None,
+    show_envvar=True,
+    help="maximum number of jobs running at once (default: from schedule or 1)",
+)
+@click.option(
+    "--shared-browser",
+    is_flag=True,
+    show_envvar=True,
+    help="run selenium plugins in one chrome (isolated browser contexts)",
+)
+@click.option("--once", is_flag=True, help="run every job once and exit")
+@click.pass_context
+def serve(ctx, schedule, max_jobs, shared_browser, once):
+    """run plugins periodically according to SCHEDULE (json file)"""
+    # pylint: disable=C0415
+    from docdl.serve import Scheduler
+
+    root_ctx = ctx.find_root()
+    root_params = root_ctx.params
+    with contextlib.ExitStack() as stack:
+        browser = None
+        if shared_browser:
+            # pylint: disable=C0415
+            from docdl.browser import SharedBrowser
+
+            browser = stack.enter_context(
+                SharedBrowser.launch(
+                    {
+                        "headless": root_params["headless"],
+                        "page_load_strategy": root_params["page_load_strategy"],
+                        "remote": root_params["remote"],
+                        "sniff": root_params["sniff"],
+                    }
+                )
+            )
+        scheduler = Scheduler.load(root_ctx, schedule, max_jobs, browser)
+        try:
+            scheduler.run(once)
+        except KeyboardInterrupt:
+            click.echo("stopping, waiting for running jobs", err=True)
+
+
+@documentdl.command()
+@click.argument("accounts", type=click.Path(exists=True, dir_okay=False))
+@click.option(
+    "--bind",
+    default="127.0.0.1:8080",
+    show_default=True,
+    show_envvar=True,
+    help="listen on HOST:PORT",
+)
+@click.option(
+    "--ttl",
+    type=int,
+    default=3600,
+    show_default=True,
+    show_envvar=True,
+    help="seconds a cached listing stays fresh",
+)
+@click.option(
+    "--max-jobs",
+    type=int,
+    default=None,
+    show_envvar=True,
+    help="maximum number of jobs running at once (default: from file or 1)",
+)
+@click.pass_context
+def api(ctx, accounts, bind, ttl, max_jobs):
+    """serve listings and downloads of ACCOUNTS (json file) via HTTP"""
+    # pylint: disable=C0415
+    from docdl.api import load, serve_http
+
+    root_ctx = ctx.find_root()
+    service = load(root_ctx, accounts, ttl, max_jobs)
+    try:
+        serve_http(service, bind)
+    except KeyboardInterrupt:
+        click.echo("stopping, waiting for running jobs", err=True)
+    finally:
+        service.close()
+
+
+@documentdl.command()
+@click.option("--plugin", default=None, help="only documents of this plugin")
+@click.option("--account", default=None, help="only documents of this username")
+@click.option("--category", default=None, help="only documents of this category")
+@click.option(
+    "--since",
+    type=click.DateTime(),
+    default=None,
+    help="only documents dated on or after this date",
+)
+@click.option(
+    "--until",
+    type=click.DateTime(),
+    default=None,
+    help="only documents dated on or before this date",
+)
+@click.pass_context
+# pylint: disable=R0913,R0917
+def query(ctx, plugin, account, category, since, until):
+    """list documents from --index without logging in"""
+    root_params = ctx.find_root().params
+    if not root_params["index_file"]:
+        raise click.UsageError("query needs --index")
+    # dates without time include the whole day
+    if until and until.time() == datetime.time():
+        until += datetime.timedelta(days=1)
+    elif until:
+        until += datetime.timedelta(seconds=1)
+    filters = [
+        docdl.filter.Filter(expression)
+        for expression in root_params["filter_expressions"]
+    ]
+    # let sqlite select the date range of filter expressions
+    for expression in filters:
+        low, high = expression.range("date")
+        if isinstance(low, datetime.datetime) and (not since or low > since):
+            since = low
+        if isinstance(high, datetime.datetime):
+            high += datetime.timedelta(seconds=1)
+            if not until or high < until:
+                until = high
+    result = []
+    with docdl.index.Index(root_params["index_file"]) as index:
+        for document in index.query(plugin, account, category, since, until):
+            if not (
                 document.match_string(root_params["string_matches"])
                 and document.match_regex(root_params["regex_matches"])
+                and document.match_filter(filters)
                 and document.match_jq(root_params["jq_matches"])
-            )
-            # skip filtered documents
-            if not filtered:
+            ):
                 continue
-            # download ?
-            if root_params["action"] == "download":
-                portal.download(document)
-            # line buffered dict output?
             if root_params["output_format"] == "dicts":
-                # always output as json dict
                 click.echo(document.toJSON())
-            # just store result for later
             else:
                 result += [document.toJSON()]
-
-        # output json list?
-        if root_params["output_format"] == "list":
-            click.echo(f"[ {','.join(result)} ]")
+    if root_params["output_format"] == "list":
+        click.echo(f"[ {','.join(result)} ]")
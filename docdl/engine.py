@@ -0,0 +1,190 @@
+"""download engines"""
+
+import concurrent.futures
+import os
+import shutil
+import time
+
+import docdl
+
+
+class ThreadEngine:
+    """
+    download documents with an url in background threads while the portal
+    keeps listing documents. requests sessions aren't thread safe, so
+    every download uses its own copy of the portal's session (cookies,
+    retries, timeouts and rate limits apply).
+    """
+
+    def __init__(self, portal, concurrency):
+        """
+        :param portal: logged in docdl.WebPortal
+        :param concurrency: maximum number of parallel downloads
+        """
+        self.portal = portal
+        self.pool = concurrent.futures.ThreadPoolExecutor(concurrency)
+        # list of (document, concurrent.futures.Future) tuples
+        self.pending = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        # drop queued downloads on error and wait for running ones, so
+        # no thread writes files after the run ended
+        self.pool.shutdown(wait=True, cancel_futures=exc_type is not None)
+
+    def accepts(self, document):
+        """:result: True if document can be downloaded by this engine"""
+        # portals with custom download() need to do it themselves
+        return (
+            document.url
+            and not document.download_element
+            and type(self.portal).download
+            in (docdl.WebPortal.download, docdl.SeleniumWebPortal.download)
+        )
+
+    def submit(self, document):
+        """start downloading document in background"""
+        # selenium portals: transfer current cookies to requests session
+        if isinstance(self.portal, docdl.SeleniumWebPortal):
+            self.portal.copy_to_requests_session()
+        # copy session here, the portal keeps using its own one
+        session = self.portal.new_session()
+        future = self.pool.submit(self._download, document, session)
+        self.pending += [(document, future)]
+
+    def _download(self, document, session):
+        start = time.monotonic()
+        filename = self.portal.download_with_requests(document, session)
+        filename = document.rename_after_download(filename, self.portal.download_dir)
+        return filename, time.monotonic() - start
+
+    def completed(self, wait=False):
+        """
+        generator that yields (document, filename, duration) of finished
+        downloads. Raises the exception of failed downloads.
+
+        :param wait: wait for all pending downloads to finish
+        """
+        while self.pending:
+            done = [
+                (document, future)
+                for document, future in self.pending
+                if wait or future.done()
+            ]
+            if not done:
+                return
+            for document, future in done:
+                self.pending.remove((document, future))
+                filename, duration = future.result()
+                yield document, filename, duration
+
+
+class TabEngine:
+    """
+    start click based downloads in extra browser tabs of the logged in
+    session. The browser transfers them in parallel while the portal
+    keeps listing documents in its own tab. Documents need a relocate()
+    callable that finds their download element in another tab.
+    """
+
+    def __init__(self, portal, tabs):
+        """
+        :param portal: logged in docdl.SeleniumWebPortal
+        :param tabs: number of tabs to open for downloads
+        """
+        self.portal = portal
+        self.tabs = tabs
+        # window handle of the portal's tab
+        self.main = None
+        # window handles of download tabs
+        self.handles = []
+        self.free = []
+        # list of (document, tab, tmpdir, start timestamp) tuples
+        self.pending = []
+        # list of (document, filename, duration) tuples not reported, yet
+        self.done = []
+
+    def __enter__(self):
+        driver = self.portal.webdriver
+        self.main = driver.current_window_handle
+        for _ in range(self.tabs):
+            self.handles += [self.portal.new_tab()]
+        driver.switch_to.window(self.main)
+        self.free = list(self.handles)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        # remove unfinished downloads
+        for _, _, tmpdir, _ in self.pending:
+            shutil.rmtree(tmpdir, ignore_errors=True)
+        driver = self.portal.webdriver
+        for handle in self.handles:
+            driver.switch_to.window(handle)
+            driver.close()
+        driver.switch_to.window(self.main)
+
+    def accepts(self, document):
+        """:result: True if document can be downloaded by this engine"""
+        # portals with custom download() need to do it themselves
+        return (
+            document.download_element
+            and document.relocate
+            and hasattr(self.portal.webdriver, "execute_cdp_cmd")
+            and type(self.portal).download == docdl.SeleniumWebPortal.download
+        )
+
+    def submit(self, document):
+        """start downloading document in a free tab"""
+        # all tabs busy? wait for the oldest download
+        if not self.free:
+            self.done += [self._finish(self.pending[0], wait=True)]
+        tab = self.free.pop(0)
+        driver = self.portal.webdriver
+        # compared with the modification time of the downloaded file
+        start = time.time()
+        driver.switch_to.window(tab)
+        try:
+            element = document.relocate()
+            self.portal.scroll_to_element(element)
+            tmpdir = self.portal.start_download(element)
+        except BaseException:
+            self.free += [tab]
+            raise
+        finally:
+            driver.switch_to.window(self.main)
+        document.download_info = {
+            "method": "selenium",
+            "retries": 0,
+            "tab": self.handles.index(tab) + 1,
+        }
+        self.pending += [(document, tab, tmpdir, start)]
+
+    def _finish(self, download, wait):
+        """:result: (document, filename, duration) or None if not finished"""
+        document, tab, tmpdir, start = download
+        filename = self.portal.finish_download(document, tmpdir, wait)
+        if not filename:
+            return None
+        # the browser stopped writing when the download finished, we may
+        # have noticed it much later
+        finished = os.path.getmtime(os.path.join(self.portal.download_dir, filename))
+        self.pending.remove(download)
+        self.free += [tab]
+        filename = document.rename_after_download(filename, self.portal.download_dir)
+        return document, filename, max(0, finished - start)
+
+    def completed(self, wait=False):
+        """
+        generator that yields (document, filename, duration) of finished
+        downloads. Raises DownloadError for failed downloads.
+
+        :param wait: wait for all pending downloads to finish
+        """
+        while self.done:
+            yield self.done.pop(0)
+        for download in list(self.pending):
+            result = self._finish(download, wait)
+            if result:
+                yield result
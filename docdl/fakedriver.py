@@ -0,0 +1,483 @@
+"""
+in-process webdriver substitute that serves saved HTML snapshots instead
+of running a browser (e.g. to benchmark documents() of selenium plugins)
+
+A snapshot directory contains HTML files and an "index.json" that maps
+urls to them: {"https://example.com/inbox": "inbox.html", ...}
+
+Elements are located with lxml (CSS selectors need cssselect). There is
+no javascript: clicking a link or submit button loads the snapshot of its
+target (if there is one), execute_script() only understands the snippets
+used by docdl and its plugins.
+"""
+
+import functools
+import json
+import os
+import re
+import urllib.parse
+
+import lxml.cssselect
+import lxml.etree
+import lxml.html
+from selenium.common.exceptions import (
+    NoSuchElementException,
+    StaleElementReferenceException,
+    WebDriverException,
+)
+
+import docdl.util
+
+# name of the file that maps urls to snapshot files
+INDEX = "index.json"
+
+# attributes that selenium reports as "true" or None
+BOOLEAN_ATTRIBUTES = (
+    "checked",
+    "disabled",
+    "hidden",
+    "multiple",
+    "readonly",
+    "selected",
+)
+
+
+# pylint: disable=R0903
+class Options:
+    """webdriver options (only kept for compatibility)"""
+
+    def __init__(self):
+        self.page_load_strategy = "normal"
+        self.headless = True
+
+
+@functools.lru_cache(maxsize=1024)
+def _css(selector):
+    """:result: compiled CSS selector"""
+    return lxml.cssselect.CSSSelector(selector, translator="html")
+
+
+@functools.lru_cache(maxsize=1024)
+def _xpath(expression):
+    """:result: compiled XPath expression"""
+    # pylint: disable=I1101
+    return lxml.etree.XPath(expression)
+
+
+# selenium "By" strategy -> function(lxml element, value) -> list of elements
+LOCATORS = {
+    "css selector": lambda element, value: _css(value)(element),
+    "xpath": lambda element, value: _xpath(value)(element),
+    "id": lambda element, value: _xpath(".//*[@id=$v]")(element, v=value),
+    "name": lambda element, value: _xpath(".//*[@name=$v]")(element, v=value),
+    "tag name": lambda element, value: _xpath(".//*[local-name()=$v]")(
+        element, v=value
+    ),
+    "class name": lambda element, value: _css(f".{value}")(element),
+    "link text": lambda element, value: _xpath(".//a[normalize-space(.)=$v]")(
+        element, v=value
+    ),
+    "partial link text": lambda element, value: _xpath(".//a[contains(., $v)]")(
+        element, v=value
+    ),
+}
+
+
+def _find(element, by, value):
+    """:result: list of lxml elements below element"""
+    try:
+        locate = LOCATORS[by]
+    except KeyError as exception:
+        raise WebDriverException(f'unsupported locator strategy: "{by}"') from exception
+    # css selectors also match the element itself, xpath may yield strings
+    return [
+        result
+        for result in locate(element, value)
+        if isinstance(result, lxml.html.HtmlElement) and result is not element
+    ]
+
+
+def save_snapshot(webdriver, directory):
+    """
+    save current page of a (real) webdriver to snapshot directory
+
+    :param webdriver: selenium webdriver
+    :param directory: snapshot directory
+    :result: filename of snapshot
+    """
+    os.makedirs(directory, exist_ok=True)
+    index_file = os.path.join(directory, INDEX)
+    index = {}
+    if os.path.exists(index_file):
+        with open(index_file, encoding="utf-8") as file:
+            index = json.load(file)
+    url = webdriver.current_url
+    filename = index.get(url) or f"{len(index):05d}.html"
+    docdl.util.atomic_write(os.path.join(directory, filename), webdriver.page_source)
+    index[url] = filename
+    docdl.util.atomic_write(index_file, json.dumps(index, indent=1))
+    return filename
+
+
+# pylint: disable=R0902
+class FakeWebDriver:
+    """webdriver that loads pages from a snapshot directory"""
+
+    def __init__(self, snapshots, useragent=None):
+        """
+        :param snapshots: snapshot directory
+        :param useragent: value of navigator.userAgent
+        """
+        self.snapshots = snapshots
+        self.useragent = useragent or "Mozilla/5.0 (X11; Linux x86_64) docdl-fake"
+        with open(os.path.join(snapshots, INDEX), encoding="utf-8") as file:
+            self.index = json.load(file)
+        # visited urls and position in history
+        self.history = []
+        self.position = -1
+        # parsed document of current page
+        self.root = lxml.html.document_fromstring("<html></html>")
+        # incremented on every page load, elements of older pages are stale
+        self.generation = 0
+        self.cookies = {}
+        self.window_handles = ["fake"]
+        self.current_window_handle = "fake"
+
+    @property
+    def current_url(self):
+        """url of current page"""
+        return self.history[self.position] if self.history else "about:blank"
+
+    @property
+    def title(self):
+        """title of current page"""
+        return " ".join(self.root.findtext(".//title", default="").split())
+
+    @property
+    def page_source(self):
+        """HTML of current page"""
+        return lxml.html.tostring(self.root, encoding="unicode")
+
+    def has_snapshot(self, url):
+        """:result: True if there's a snapshot of url"""
+        return urllib.parse.urldefrag(url).url in self.index
+
+    def _load(self, url):
+        try:
+            filename = self.index[urllib.parse.urldefrag(url).url]
+        except KeyError as exception:
+            raise WebDriverException(f"no snapshot of {url}") from exception
+        # parse on every visit, so changes made to the last visit are gone
+        self.root = lxml.html.parse(os.path.join(self.snapshots, filename)).getroot()
+        self.generation += 1
+
+    def get(self, url):
+        """load snapshot of url"""
+        self._load(url)
+        # drop forward history
+        keep = self.position + 1
+        del self.history[keep:]
+        self.history += [url]
+        self.position += 1
+
+    def back(self):
+        """go back in history"""
+        if self.position > 0:
+            self.position -= 1
+            self._load(self.current_url)
+
+    def forward(self):
+        """go forward in history"""
+        if self.position < len(self.history) - 1:
+            self.position += 1
+            self._load(self.current_url)
+
+    def refresh(self):
+        """reload current page"""
+        if self.history:
+            self._load(self.current_url)
+
+    def find_element(self, by="id", value=None):
+        """:result: first FakeWebElement matching locator"""
+        return self._wrap(self.root, by, value)[0]
+
+    def find_elements(self, by="id", value=None):
+        """:result: list of FakeWebElements matching locator"""
+        return self._wrap(self.root, by, value, required=False)
+
+    def _wrap(self, element, by, value, required=True):
+        elements = [
+            FakeWebElement(self, result, self.generation)
+            for result in _find(element, by, value)
+        ]
+        if required and not elements:
+            raise NoSuchElementException(f'no element with {by} "{value}"')
+        return elements
+
+    def execute_script(self, script, *args):
+        """execute one of the known javascript snippets"""
+        script = script.strip().rstrip(";")
+        for pattern, snippet in SCRIPTS:
+            match = re.fullmatch(pattern, script)
+            if match:
+                return snippet(self, match, *args)
+        raise WebDriverException(f"fake webdriver can't execute script: {script}")
+
+    def get_cookies(self):
+        """:result: list of cookie dicts"""
+        return list(self.cookies.values())
+
+    def get_cookie(self, name):
+        """:result: cookie dict or None"""
+        return self.cookies.get(name)
+
+    def add_cookie(self, cookie):
+        """set cookie"""
+        self.cookies[cookie["name"]] = cookie
+
+    def delete_cookie(self, name):
+        """remove cookie"""
+        self.cookies.pop(name, None)
+
+    def delete_all_cookies(self):
+        """remove all cookies"""
+        self.cookies = {}
+
+    def implicitly_wait(self, time_to_wait):
+        """nothing to wait for"""
+
+    def set_page_load_timeout(self, time_to_wait):
+        """nothing to wait for"""
+
+    def close(self):
+        """nothing to close"""
+
+    def quit(self):
+        """nothing to quit"""
+
+
+class FakeWebElement:
+    """element of a snapshot page"""
+
+    def __init__(self, driver, element, generation):
+        """
+        :param driver: FakeWebDriver
+        :param element: lxml element
+        :param generation: page generation the element belongs to
+        """
+        self.parent = driver
+        self.element = element
+        self.generation = generation
+
+    def __eq__(self, other):
+        return isinstance(other, FakeWebElement) and self.element is other.element
+
+    def __hash__(self):
+        return id(self.element)
+
+    @property
+    def _element(self):
+        """lxml element (raises if page changed in the meantime)"""
+        if self.generation != self.parent.generation:
+            raise StaleElementReferenceException("element is not attached to the page")
+        return self.element
+
+    @property
+    def id(self):  # pylint: disable=C0103
+        """element id"""
+        return str(id(self.element))
+
+    @property
+    def tag_name(self):
+        """tag name of element"""
+        return self._element.tag.lower()
+
+    @property
+    def text(self):
+        """text content of element (whitespace normalized per line)"""
+        lines = (
+            " ".join(line.split()) for line in self._element.text_content().split("\n")
+        )
+        return "\n".join(line for line in lines if line)
+
+    @property
+    def location(self):
+        """there's no layout"""
+        return {"x": 0, "y": 0}
+
+    @property
+    def size(self):
+        """there's no layout"""
+        return {"height": 0, "width": 0}
+
+    @property
+    def rect(self):
+        """there's no layout"""
+        return {**self.location, **self.size}
+
+    def find_element(self, by="id", value=None):
+        """:result: first FakeWebElement below this element matching locator"""
+        # pylint: disable=W0212
+        return self.parent._wrap(self._element, by, value)[0]
+
+    def find_elements(self, by="id", value=None):
+        """:result: list of FakeWebElements below this element matching locator"""
+        # pylint: disable=W0212
+        return self.parent._wrap(self._element, by, value, required=False)
+
+    def get_dom_attribute(self, name):
+        """:result: value of HTML attribute"""
+        return self._element.get(name)
+
+    # pylint: disable=R0911
+    def get_property(self, name):
+        """:result: value of (a few) DOM properties"""
+        element = self._element
+        if name in ("innerText", "textContent"):
+            return self.text if name == "innerText" else element.text_content()
+        if name == "innerHTML":
+            return (element.text or "") + "".join(
+                lxml.html.tostring(child, encoding="unicode") for child in element
+            )
+        if name == "outerHTML":
+            return lxml.html.tostring(element, encoding="unicode", with_tail=False)
+        if name == "index" and element.tag == "option":
+            return element.xpath("count(preceding::option)")
+        if name in ("href", "src", "action") and element.get(name) is not None:
+            # selenium returns absolute urls
+            return urllib.parse.urljoin(self.parent.current_url, element.get(name))
+        if name == "value" and element.tag == "textarea":
+            return element.text or ""
+        if name == "value" and element.tag == "option" and element.get(name) is None:
+            return self.text
+        if name in BOOLEAN_ATTRIBUTES:
+            return element.get(name) is not None
+        return element.get(name)
+
+    def get_attribute(self, name):
+        """:result: property or attribute value like selenium"""
+        value = self.get_property(name)
+        if isinstance(value, bool):
+            return "true" if value else None
+        if isinstance(value, float):
+            return str(int(value))
+        return value
+
+    def is_displayed(self):
+        """:result: False if element or one of its parents is hidden"""
+        element = self._element
+        if element.tag == "input" and element.get("type") == "hidden":
+            return False
+        for node in [element, *element.iterancestors()]:
+            style = node.get("style", "").replace(" ", "").lower()
+            if (
+                node.get("hidden") is not None
+                or "display:none" in style
+                or "visibility:hidden" in style
+            ):
+                return False
+        return True
+
+    def is_enabled(self):
+        """:result: False if element is disabled"""
+        return self._element.get("disabled") is None
+
+    def is_selected(self):
+        """:result: True for checked/selected elements"""
+        element = self._element
+        return element.get("checked") is not None or element.get("selected") is not None
+
+    def clear(self):
+        """clear input value"""
+        self._element.set("value", "")
+
+    def send_keys(self, *value):
+        """append text to input value"""
+        element = self._element
+        element.set("value", element.get("value", "") + "".join(map(str, value)))
+
+    def click(self):
+        """
+        select options, toggle checkboxes and follow links/submit buttons
+        if there's a snapshot of their target
+        """
+        element = self._element
+        if element.tag == "option":
+            select = next(element.iterancestors("select"), None)
+            if select is not None and select.get("multiple") is None:
+                for option in select.iter("option"):
+                    option.attrib.pop("selected", None)
+            element.set("selected", "selected")
+        elif element.get("type") in ("checkbox", "radio"):
+            if element.get("checked") is None:
+                element.set("checked", "checked")
+            else:
+                element.attrib.pop("checked")
+        # follow link
+        link = next(element.iterancestors("a"), None) if element.tag != "a" else element
+        if link is not None and link.get("href"):
+            self._follow(link.get("href"))
+            return
+        # submit form
+        if element.tag in ("button", "input") and element.get("type", "submit") in (
+            "submit",
+            "image",
+        ):
+            self.submit()
+
+    def submit(self):
+        """load snapshot of form action"""
+        form = next(self._element.iterancestors("form"), None)
+        if form is not None:
+            self._follow(form.get("action") or self.parent.current_url)
+
+    def _follow(self, href):
+        url = urllib.parse.urljoin(self.parent.current_url, href)
+        if self.parent.has_snapshot(url):
+            self.parent.get(url)
+
+    def screenshot(self, filename):
+        """there's nothing to render, write empty file"""
+        with open(filename, "wb"):
+            pass
+        return True
+
+
+def _scroll_height(driver, _match, *_args):
+    # fake a page height that grows with the document
+    return sum(1 for _ in driver.root.iter()) * 20
+
+
+def _element_property(_driver, match, element, *_args):
+    return element.get_property(match.group(1))
+
+
+def _click(_driver, _match, element, *_args):
+    element.click()
+
+
+def _set_style(_driver, match, element, *_args):
+    # pylint: disable=W0212
+    node = element._element
+    node.set("style", f"{node.get('style', '')};{match.group(1)}:{match.group(2)}")
+
+
+# known javascript snippets: (regex, function(driver, match, *args))
+SCRIPTS = [
+    (r"return navigator\.userAgent", lambda driver, *_: driver.useragent),
+    (r"return document\.title", lambda driver, *_: driver.title),
+    (r"return document\.readyState", lambda *_: "complete"),
+    (r"return document\.(?:documentElement|body)\.scrollHeight", _scroll_height),
+    (
+        r"return arguments\[0\]\.(innerText|textContent|innerHTML|outerHTML)",
+        _element_property,
+    ),
+    (r"arguments\[0\]\.click\(\)", _click),
+    (r"arguments\[0\]\.style\.(\w+)\s*=\s*['\"]([^'\"]*)['\"]", _set_style),
+    # scrolling doesn't change anything without layout
+    (
+        r"(?:\s*(?:arguments\[0\]\.scrollIntoView|window\.scrollBy|window\.scrollTo)"
+        r"\([^;]*\)\s*;?)+",
+        lambda *_: None,
+    ),
+]
@@ -0,0 +1,366 @@
+"""
+filter expressions that are parsed once and compiled to python predicates
+working on the native document attributes, e.g.
+
+    date >= 2023-01-01 and category ~ "BILL" and not amount < 10.5
+
+Comparisons: == (or =), !=, <, <=, >, >=, ~ (regex search), !~
+Values: numbers, dates (2023-01-01, 2023-01-01T12:00), quoted strings or
+bare words. The value decides how the attribute is compared: numbers
+compare with numbers (strings like "1.234,50 €" are parsed, the last ","
+or "." is the decimal separator unless it's repeated), dates with
+datetime attributes and strings with the attribute as string. Nested
+attributes use dots (download.bytes), a bare attribute name tests that
+the attribute is set and not empty.
+Comparisons with missing attributes are always false.
+"""
+
+import collections.abc
+import datetime
+import operator
+import re
+
+TOKENS = re.compile(
+    r"""\s*(?:
+    (?P<string>"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')
+    |(?P<date>\d{4}-\d\d-\d\d(?:[T ]\d\d:\d\d(?::\d\d)?)?)(?=[\s()=!<>~]|$)
+    |(?P<number>-?\d+(?:[.,]\d+)?)(?=[\s()=!<>~]|$)
+    |(?P<op>==|!=|<=|>=|!~|<|>|~|=)
+    |(?P<paren>[()])
+    |(?P<word>[^\s()=!<>~"']+)
+    )""",
+    re.VERBOSE,
+)
+
+OPERATORS = {
+    "==": operator.eq,
+    "=": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+}
+
+# number in attribute strings, e.g. "1.234,56 €"
+NUMBER = re.compile(r"-?\d(?:[\d.,]*\d)?")
+
+# missing attributes
+MISSING = object()
+
+
+class FilterError(ValueError):
+    """invalid filter expression"""
+
+
+class Filter:
+    """compiled filter expression, call it with document attributes"""
+
+    def __init__(self, expression):
+        """
+        :param expression: filter expression string
+        """
+        self.expression = expression
+        self.tree = Parser(expression).parse()
+        self.predicate = _compile(self.tree)
+
+    def __call__(self, attributes):
+        """:result: True if attributes match"""
+        return self.predicate(attributes)
+
+    def names(self):
+        """:result: set of (top level) attribute names the expression reads"""
+        return _names(self.tree)
+
+    def optimize(self, cost):
+        """
+        evaluate cheap terms of and/or first, so expensive ones are
+        skipped if possible
+
+        :param cost: function that returns the cost of reading a set of
+                     attribute names
+        """
+        self.tree = _reorder(self.tree, cost)
+        self.predicate = _compile(self.tree)
+        return self
+
+    def range(self, attribute):
+        """
+        bounds the expression sets for an attribute (e.g. to narrow
+        queries before filtering)
+
+        :param attribute: attribute name
+        :result: (lowest value or None, highest value or None) tuple
+        """
+        return _range(self.tree, attribute)
+
+
+class Parser:
+    """recursive descent parser that builds a tuple tree"""
+
+    def __init__(self, expression):
+        self.expression = expression
+        self.tokens = self._tokenize(expression)
+        self.position = 0
+
+    def _tokenize(self, expression):
+        tokens = []
+        position = 0
+        expression = expression.rstrip()
+        while position < len(expression):
+            match = TOKENS.match(expression, position)
+            if not match:
+                raise FilterError(
+                    f"invalid filter at {position}: {expression[position:]!r}"
+                )
+            tokens += [(match.lastgroup, match.group(match.lastgroup))]
+            position = match.end()
+        return tokens
+
+    def peek(self):
+        """:result: next (kind, text) token or (None, None)"""
+        if self.position < len(self.tokens):
+            return self.tokens[self.position]
+        return None, None
+
+    def take(self):
+        """:result: next (kind, text) token"""
+        token = self.peek()
+        if token[0] is None:
+            raise FilterError(f"unexpected end of filter {self.expression!r}")
+        self.position += 1
+        return token
+
+    def parse(self):
+        """:result: tree of the whole expression"""
+        tree = self._or()
+        if self.peek()[0] is not None:
+            raise FilterError(f"unexpected {self.peek()[1]!r} in {self.expression!r}")
+        return tree
+
+    def _or(self):
+        terms = [self._and()]
+        while self.peek() == ("word", "or"):
+            self.take()
+            terms += [self._and()]
+        return ("or", terms) if len(terms) > 1 else terms[0]
+
+    def _and(self):
+        terms = [self._not()]
+        while self.peek() == ("word", "and"):
+            self.take()
+            terms += [self._not()]
+        return ("and", terms) if len(terms) > 1 else terms[0]
+
+    def _not(self):
+        if self.peek() == ("word", "not"):
+            self.take()
+            return ("not", self._not())
+        return self._comparison()
+
+    def _comparison(self):
+        kind, text = self.take()
+        if (kind, text) == ("paren", "("):
+            tree = self._or()
+            if self.take() != ("paren", ")"):
+                raise FilterError(f"missing ) in {self.expression!r}")
+            return tree
+        if kind != "word" or text in ("and", "or", "not"):
+            raise FilterError(f"expected attribute name, got {text!r}")
+        if self.peek()[0] != "op":
+            return ("set", text)
+        _, op = self.take()
+        return ("compare", text, op, self._value())
+
+    def _value(self):
+        kind, text = self.take()
+        if kind == "string":
+            # remove quotes and backslash escapes
+            return re.sub(r"\\(.)", r"\1", text[1:-1])
+        if kind == "date":
+            return datetime.datetime.fromisoformat(text)
+        if kind == "number":
+            return float(text.replace(",", "."))
+        if kind == "word":
+            return text
+        raise FilterError(f"expected value, got {text!r}")
+
+
+def _getter(name):
+    """:result: function that gets (nested) attribute or MISSING"""
+    path = name.split(".")
+
+    def get(attributes):
+        value = attributes
+        for key in path:
+            if not isinstance(value, collections.abc.Mapping) or key not in value:
+                return MISSING
+            value = value[key]
+        return value
+
+    return get
+
+
+def _number(value):
+    """
+    :result: value as float or None, the last "," or "." of strings is
+             the decimal separator unless it's repeated
+
+    >>> _number("1.234,56 €"), _number("1,234.56"), _number("12,50")
+    (1234.56, 1234.56, 12.5)
+    >>> _number("1.234.567"), _number("-0,5"), _number("n/a")
+    (1234567.0, -0.5, None)
+    """
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return value
+    match = NUMBER.search(str(value))
+    if not match:
+        return None
+    number = match.group()
+    separators = [char for char in number if char in ",."]
+    if separators:
+        decimal = separators[-1]
+        # a repeated separator only groups thousands
+        if separators.count(decimal) > 1:
+            decimal = None
+        thousands = ",." if decimal is None else ",.".replace(decimal, "")
+        number = number.translate(str.maketrans("", "", thousands))
+        if decimal:
+            number = number.replace(decimal, ".")
+    return float(number)
+
+
+def _date(value):
+    """:result: value as datetime or None"""
+    if isinstance(value, datetime.datetime):
+        return value
+    try:
+        return datetime.datetime.fromisoformat(str(value).removesuffix("Z"))
+    except ValueError:
+        return None
+
+
+def _converter(literal):
+    """:result: function that converts attribute values like literal"""
+    if isinstance(literal, datetime.datetime):
+        return _date
+    if isinstance(literal, float):
+        return _number
+    return str
+
+
+def coerce(value, literal):
+    """
+    :result: attribute value converted for comparisons with literal or
+             None if it can't be compared
+    """
+    if value is None:
+        return None
+    return _converter(literal)(value)
+
+
+def _compare(name, op, literal):
+    """:result: predicate for one comparison"""
+    get = _getter(name)
+    # literal decides how to convert attribute values
+    convert = _converter(literal)
+
+    if op in ("~", "!~"):
+        try:
+            search = re.compile(str(literal)).search
+        except re.error as error:
+            raise FilterError(f"invalid regex {literal!r}: {error}") from error
+
+        def test(value):
+            return (search(str(value)) is not None) == (op == "~")
+
+    else:
+        compare = OPERATORS[op]
+
+        def test(value):
+            return compare(value, literal)
+
+    def predicate(attributes):
+        value = get(attributes)
+        if value is MISSING or value is None:
+            return False
+        if op not in ("~", "!~"):
+            value = convert(value)
+            if value is None:
+                return False
+        try:
+            return test(value)
+        # e.g. timezone aware vs naive datetime
+        except TypeError:
+            return False
+
+    return predicate
+
+
+def _compile(tree):
+    """:result: predicate for tree"""
+    kind = tree[0]
+    if kind == "and":
+        terms = [_compile(term) for term in tree[1]]
+        return lambda attributes: all(term(attributes) for term in terms)
+    if kind == "or":
+        terms = [_compile(term) for term in tree[1]]
+        return lambda attributes: any(term(attributes) for term in terms)
+    if kind == "not":
+        term = _compile(tree[1])
+        return lambda attributes: not term(attributes)
+    if kind == "set":
+        get = _getter(tree[1])
+        return lambda attributes: get(attributes) not in (MISSING, None, "", [], {})
+    return _compare(*tree[1:])
+
+
+def _names(tree):
+    """:result: set of attribute names in tree"""
+    if tree[0] in ("and", "or"):
+        return set().union(*(_names(term) for term in tree[1]))
+    if tree[0] == "not":
+        return _names(tree[1])
+    return {tree[1].split(".")[0]}
+
+
+def _reorder(tree, cost):
+    """:result: tree with cheapest terms first"""
+    if tree[0] in ("and", "or"):
+        terms = [_reorder(term, cost) for term in tree[1]]
+        return (tree[0], sorted(terms, key=lambda term: cost(_names(term))))
+    if tree[0] == "not":
+        return ("not", _reorder(tree[1], cost))
+    return tree
+
+
+def _range(tree, attribute):
+    """:result: (low, high) bounds of attribute in tree"""
+    low, high = None, None
+    if tree[0] == "and":
+        for term in tree[1]:
+            term_low, term_high = _range(term, attribute)
+            # bounds of another type can't be compared, skip them (the
+            # predicate still checks them)
+            if _narrows(term_low, low, operator.gt):
+                low = term_low
+            if _narrows(term_high, high, operator.lt):
+                high = term_high
+    elif tree[0] == "compare" and tree[1] == attribute:
+        _, _, op, literal = tree
+        if op in (">", ">=", "==", "="):
+            low = literal
+        if op in ("<", "<=", "==", "="):
+            high = literal
+    return low, high
+
+
+def _narrows(bound, current, compare):
+    """:result: True if bound is of the type of current and narrows it"""
+    if bound is None:
+        return False
+    if current is None:
+        return True
+    return type(bound) is type(current) and compare(bound, current)
@@ -0,0 +1,166 @@
+"""
+local sqlite index of listed documents, so they can be queried without
+logging in (document-dl query)
+"""
+
+import datetime
+import hashlib
+import json
+import re
+import sqlite3
+import weakref
+
+import docdl
+import docdl.util.dateparser
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    plugin TEXT NOT NULL,
+    account TEXT NOT NULL,
+    id TEXT NOT NULL,
+    date TEXT,
+    category TEXT,
+    attributes TEXT NOT NULL,
+    seen REAL NOT NULL,
+    PRIMARY KEY (plugin, account, id)
+);
+CREATE INDEX IF NOT EXISTS documents_date ON documents (plugin, account, date);
+CREATE INDEX IF NOT EXISTS documents_category ON documents (category, date);
+CREATE INDEX IF NOT EXISTS documents_all_dates ON documents (date);
+"""
+
+# dates as written by docdl.util.dateparser.DateEncoder
+ISODATE = re.compile(r"^\d{4}-\d\d-\d\dT\d\d:\d\d:\d\d(\.\d+)?Z$")
+
+# attributes that change between runs (plugins count ids per run)
+VOLATILE = ("id", "download", "unread")
+
+
+class Index:
+    """documents of all plugins and accounts in a sqlite database"""
+
+    def __init__(self, filename):
+        """
+        :param filename: path of sqlite database
+        """
+        self.connection = sqlite3.connect(filename)
+        self.connection.executescript(SCHEMA)
+        # identity of documents added in this run
+        self.identities = weakref.WeakKeyDictionary()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        """close database"""
+        self.connection.close()
+
+    @staticmethod
+    def identify(document):
+        """
+        :result: hash of the url and the attributes (except VOLATILE ones,
+                 unless there are no others) of a listed document
+        """
+        attributes = json.loads(document.toJSON())
+        identity = {
+            name: value for name, value in attributes.items() if name not in VOLATILE
+        }
+        if document.url:
+            identity["url"] = document.url
+        # nothing else to tell documents apart
+        if not identity:
+            identity = {"id": attributes.get("id")}
+        return hashlib.sha256(
+            json.dumps(identity, sort_keys=True).encode("utf-8")
+        ).hexdigest()
+
+    def add(self, plugin, account, document):
+        """
+        insert or replace document. It's identified by the attributes it
+        was listed with, so adding it again after resolving or downloading
+        it replaces its row. Download statistics of earlier runs are kept.
+
+        :param plugin: name of plugin that found the document
+        :param account: username of login
+        :param document: docdl.Document
+        """
+        if document not in self.identities:
+            self.identities[document] = self.identify(document)
+        document_id = self.identities[document]
+        attributes = json.loads(document.toJSON())
+        date = attributes.get("date")
+        with self.connection:
+            stored = self.connection.execute(
+                "SELECT attributes FROM documents"
+                " WHERE plugin = ? AND account = ? AND id = ?",
+                (plugin, account, document_id),
+            ).fetchone()
+            if stored and "download" not in attributes:
+                download = json.loads(stored[0]).get("download")
+                if download:
+                    attributes["download"] = download
+            self.connection.execute(
+                "INSERT OR REPLACE INTO documents VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    plugin,
+                    account,
+                    document_id,
+                    date if isinstance(date, str) else None,
+                    str(attributes["category"]) if "category" in attributes else None,
+                    json.dumps(attributes, sort_keys=True),
+                    datetime.datetime.now().timestamp(),
+                ),
+            )
+
+    # pylint: disable=R0913,R0917
+    def query(self, plugin=None, account=None, category=None, since=None, until=None):
+        """
+        generator that yields indexed docdl.Documents
+
+        :param plugin: only documents of this plugin
+        :param account: only documents of this account
+        :param category: only documents of this category
+        :param since: only documents dated on or after this datetime
+        :param until: only documents dated before this datetime
+        """
+        conditions = []
+        values = []
+        for column, value in (
+            ("plugin = ?", plugin),
+            ("account = ?", account),
+            ("category = ?", category),
+            ("date >= ?", self._date(since)),
+            ("date < ?", self._date(until)),
+        ):
+            if value is not None:
+                conditions += [column]
+                values += [value]
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        for (attributes,) in self.connection.execute(
+            f"SELECT attributes FROM documents {where}"
+            " ORDER BY plugin, account, date DESC",
+            values,
+        ):
+            yield docdl.Document(attributes=self._decode(json.loads(attributes)))
+
+    @staticmethod
+    def _date(value):
+        """:result: datetime as stored by DateEncoder"""
+        if value is None:
+            return None
+        return json.loads(json.dumps(value, cls=docdl.util.dateparser.DateEncoder))
+
+    @staticmethod
+    def _decode(attributes):
+        """convert dates back to datetime objects"""
+        return {
+            name: (
+                datetime.datetime.fromisoformat(value[:-1])
+                if isinstance(value, str) and ISODATE.match(value)
+                else value
+            )
+            for name, value in attributes.items()
+        }
@@ -0,0 +1,125 @@
+"""collect run metrics and export them in prometheus textfile format"""
+
+import contextlib
+import time
+
+import docdl.util
+
+
+class Metrics:
+    """
+    metrics of a single document-dl run that can be written as
+    node_exporter textfile (https://github.com/prometheus/node_exporter#textfile-collector)
+    """
+
+    # prefix of all metric names
+    PREFIX = "docdl"
+
+    # gauges: name -> help text
+    GAUGES = {
+        "documents_listed": "documents listed by the portal",
+        "documents_matched": "documents that matched all filters",
+        "documents_downloaded": "documents downloaded",
+        "documents_sniffed": "download urls captured from download elements",
+        "stopped_early": "1 if listing stopped at a filter bound of its sort order",
+        "bytes_downloaded": "bytes downloaded",
+        "login_success": "1 if login succeeded, 0 otherwise",
+        "login_failures": "failed login attempts",
+        "run_success": "1 if the run finished without error, 0 otherwise",
+        "run_duration_seconds": "wall clock duration of the run",
+        "last_run_timestamp_seconds": "unix timestamp of the end of the run",
+    }
+
+    def __init__(self, plugin, account):
+        """
+        :param plugin: name of the plugin (used as label)
+        :param account: login id of the account (used as label)
+        """
+        self.labels = {"plugin": plugin, "account": account}
+        self.values = dict.fromkeys(self.GAUGES, 0)
+        # accumulated duration per phase (seconds)
+        self.phases = {}
+        # start times of currently running phases
+        self.running = {}
+        self.started = time.monotonic()
+
+    def inc(self, name, value=1):
+        """increment gauge"""
+        self.values[name] += value
+
+    def set(self, name, value):
+        """set gauge to value"""
+        self.values[name] = value
+
+    def start(self, name):
+        """start measuring duration of a phase"""
+        self.running[name] = time.monotonic()
+
+    def stop(self, name):
+        """stop measuring phase (durations accumulate)"""
+        # ignore phases that were never started
+        if name not in self.running:
+            return
+        duration = time.monotonic() - self.running.pop(name)
+        self.phases[name] = self.phases.get(name, 0) + duration
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        """measure duration of a phase"""
+        self.start(name)
+        try:
+            yield
+        finally:
+            self.stop(name)
+
+    def iterate(self, name, iterable):
+        """generator that counts time spent in iterable as phase"""
+        iterator = iter(iterable)
+        while True:
+            with self.phase(name):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    def finish(self, success):
+        """record end of run"""
+        self.set("run_success", int(success))
+        self.set("run_duration_seconds", time.monotonic() - self.started)
+        self.set("last_run_timestamp_seconds", time.time())
+
+    def render(self):
+        """:result: metrics in prometheus text exposition format"""
+
+        def _labels(**extra):
+            labels = {**self.labels, **extra}
+            return ",".join(
+                f'{name}="{_escape(str(value))}"' for name, value in labels.items()
+            )
+
+        def _escape(value):
+            return (
+                value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+            )
+
+        lines = []
+        for name, description in self.GAUGES.items():
+            lines += [
+                f"# HELP {self.PREFIX}_{name} {description}",
+                f"# TYPE {self.PREFIX}_{name} gauge",
+                f"{self.PREFIX}_{name}{{{_labels()}}} {self.values[name]}",
+            ]
+        # durations per phase
+        name = f"{self.PREFIX}_phase_duration_seconds"
+        lines += [
+            f"# HELP {name} seconds spent per phase of the run",
+            f"# TYPE {name} gauge",
+        ]
+        for phase, duration in self.phases.items():
+            lines += [f"{name}{{{_labels(phase=phase)}}} {duration:.6f}"]
+        return "\n".join(lines) + "\n"
+
+    def write(self, filename):
+        """atomically write metrics to file"""
+        docdl.util.atomic_write(filename, self.render())
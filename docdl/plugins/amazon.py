@@ -4,11 +4,13 @@ download documents from Amazon
 @todo handle "add mobile phone number?" dialog after login
 """
 
+import functools
 import re
+import urllib.parse
 import click
 from slugify import slugify
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait, Select
+from selenium.webdriver.support.ui import Select
 from selenium.webdriver.support import expected_conditions as EC
 
 import docdl
@@ -23,13 +25,34 @@ class Amazon(docdl.SeleniumWebPortal):
           runs.
     """
 
+    # always load images (for captchas)
+    ALLOWED_RESOURCES = ("images",)
+
+    # we wait for all elements we need
+    PAGE_LOAD_STRATEGY = "eager"
+
+    KEEP_SESSION = True
+
+    # order list pages only know order number and year, everything else
+    # needs the order details page
+    CAPABILITIES = docdl.Capabilities(
+        attributes={
+            **dict.fromkeys(("id", "order", "year"), "listing"),
+            **dict.fromkeys(
+                ("date", "product", "invoices", "filename", "warning"), "details"
+            ),
+        },
+        # newest year first, archived orders (without year) last
+        sort=("year", "desc"),
+    )
+
     def login(self):
         # use this toplevel domain
         tld = self.arguments["tld"]
         # load homepage
-        self.webdriver.get(f"https://amazon.{tld}")
+        self.get(f"https://amazon.{tld}")
         # wait for account-link or captcha request
-        WebDriverWait(self.webdriver, self.TIMEOUT).until(
+        self.wait().until(
             EC.presence_of_element_located(
                 (
                     By.XPATH,
@@ -45,7 +68,7 @@ class Amazon(docdl.SeleniumWebPortal):
             self._handle_captcha(captcha_entry)
 
         # get loginbutton
-        loginbutton = WebDriverWait(self.webdriver, self.TIMEOUT).until(
+        loginbutton = self.wait().until(
             EC.presence_of_element_located(
                 (
                     By.XPATH,
@@ -94,17 +117,22 @@ class Amazon(docdl.SeleniumWebPortal):
 
     def logout(self):
         tld = self.arguments["tld"]
-        self.webdriver.get(f"https://www.amazon.{tld}/gp/flex/sign-out.html")
+        self.get(f"https://www.amazon.{tld}/gp/flex/sign-out.html")
 
     def documents(self):
-        # count all documents
-        i = 0
+        # count all documents (continue interrupted run)
+        i = self.resume.get("id", 0)
         # use this toplevel domain
         tld = self.arguments["tld"]
         # load page with orders
-        self.webdriver.get(f"https://www.amazon.{tld}/gp/your-account/order-history")
+        order_history = f"https://www.amazon.{tld}/gp/your-account/order-history"
+        self.get(order_history)
         # get options from orderfilter so we get all available invoices
         options = self._orderfilter_options()
+        # skip options we already got
+        if self.resume.get("option") in options:
+            first = options.index(self.resume["option"])
+            options = options[first:]
         # iterate all years (+ archived orders)
         limit_year = self.arguments["limit_year"]
         for option in options:
@@ -113,10 +141,11 @@ class Amazon(docdl.SeleniumWebPortal):
                 # debug(f"skipping option {option} due to limit_year set
                 # to {limit_year}")
                 continue
-            # go back to order overview except if we already are on
-            # the overview page
+            # we can resume from here
+            self.checkpoint(option=option, id=i)
+            # go back to order overview if order details were loaded
             if "order-details" in self.webdriver.current_url:
-                self.webdriver.back()
+                self.get(order_history)
             # select current orderfilter option
             self._set_orderfilter(option)
             # scroll down to load all orders
@@ -128,87 +157,109 @@ class Amazon(docdl.SeleniumWebPortal):
                     By.XPATH, "//a[contains(@href, 'order-details')]"
                 )
             ]
-            # iterate order-detail pages
-            for order_link in order_detail_links:
-                # go back to order overview except if we already are on
-                # the overview page
-                if "order-details" in self.webdriver.current_url:
-                    self.webdriver.back()
-                # load order details page
-                self.webdriver.get(order_link)
-                # wait for invoice links or alert
-                if not self._wait_for_result(
-                    By.CSS_SELECTOR,
-                    ".order-date-invoice-item",
-                    By.CSS_SELECTOR,
-                    ".a-alert-container",
-                ):
-                    # skip on alert
-                    continue
-                # get all invoice urls
-                invoice_urls = self.webdriver.find_elements(
-                    By.XPATH, "//a[contains(@href, '.pdf')]"
+            # one document per order, the order details page only gets
+            # loaded if filters or output need its attributes
+            for order_link in dict.fromkeys(order_detail_links):
+                query = urllib.parse.parse_qs(urllib.parse.urlsplit(order_link).query)
+                document = docdl.Document(
+                    attributes={
+                        "order": query.get("orderID", [None])[0],
+                        "year": int(option[5:]) if option.startswith("year-") else None,
+                        "id": i,
+                    },
+                    resolvers=dict.fromkeys(
+                        ("date", "product", "invoices", "filename", "warning"),
+                        functools.partial(self._order_details, order_link),
+                    ),
                 )
-                # remove doubles
-                invoice_urls = set(e.get_attribute("href") for e in invoice_urls)
-                # extract items that contain order number and order date
-                date_nr = self.webdriver.find_elements(
-                    By.CSS_SELECTOR, "span.order-date-invoice-item"
-                )
-                date = date_nr[0].get_attribute("textContent").strip()
-                order_nr = date_nr[1].get_attribute("textContent").strip()
-                # parse date
-                date = re.match(r"[^\d]*(.+)$", date)[1]
-                date = docdl.util.parse_date(date)
-                # parse order number
-                order_nr = re.match(r"[^\d]*(.+)$", order_nr)[1]
-                # get product name
-                product_name = (
-                    self.webdriver.find_element(
-                        By.XPATH,
-                        "//div[@class='a-row']/a[contains(@href, '/product/')]",
-                    )
-                    .get_attribute("textContent")
-                    .strip()
-                )
-                # some orders don't have invoices
-                if len(invoice_urls) == 0:
-                    # generate empty entry with warning
-                    yield docdl.Document(
-                        url=None,
-                        attributes={
-                            "date": date,
-                            "order": order_nr,
-                            "id": i,
-                            "product": product_name,
-                            "warning": "no invoice available!",
-                        },
-                    )
-                    continue
-
-                # generate invoices
-                for url in invoice_urls:
-                    filename = (
-                        f"amazon-{date.strftime('%Y%m%d')}-"
-                        f"{order_nr}-{slugify(product_name)}.pdf"
-                    )
+                yield document
+                # further invoices of this order (only known if the
+                # details were loaded), their ids are derived from the
+                # order's id, so ids don't depend on filters
+                for number, url in enumerate(
+                    document.attributes.get("invoices", [])[1:], start=2
+                ):
+                    attributes = {
+                        name: value
+                        for name, value in document.attributes.items()
+                        if name != "download"
+                    }
                     yield docdl.Document(
                         url=url,
                         attributes={
-                            "date": date,
-                            "order": order_nr,
-                            "id": i,
-                            "product": product_name,
-                            "filename": filename,
+                            **attributes,
+                            "id": f"{i}-{number}",
+                            "filename": attributes["filename"].replace(
+                                ".pdf", f"-{number}.pdf"
+                            ),
                         },
                     )
-                    # increment counter
-                    i += 1
+                i += 1
+
+    def _order_details(self, order_link, document):
+        """resolve attributes of an order from its details page"""
+        # load order details page
+        self.get(order_link)
+        # wait for invoice links or alert
+        if not self._wait_for_result(
+            By.CSS_SELECTOR,
+            ".order-date-invoice-item",
+            By.CSS_SELECTOR,
+            ".a-alert-container",
+        ):
+            document.attributes["warning"] = "order details not available!"
+            return
+        # get all invoice urls without doubles
+        invoice_urls = list(
+            dict.fromkeys(
+                e.get_attribute("href")
+                for e in self.webdriver.find_elements(
+                    By.XPATH, "//a[contains(@href, '.pdf')]"
+                )
+            )
+        )
+        # extract items that contain order number and order date
+        date_nr = self.webdriver.find_elements(
+            By.CSS_SELECTOR, "span.order-date-invoice-item"
+        )
+        date = date_nr[0].get_attribute("textContent").strip()
+        order_nr = date_nr[1].get_attribute("textContent").strip()
+        # parse date
+        date = re.match(r"[^\d]*(.+)$", date)[1]
+        date = docdl.util.parse_date(date)
+        # parse order number
+        order_nr = re.match(r"[^\d]*(.+)$", order_nr)[1]
+        # get product name
+        product_name = (
+            self.webdriver.find_element(
+                By.XPATH,
+                "//div[@class='a-row']/a[contains(@href, '/product/')]",
+            )
+            .get_attribute("textContent")
+            .strip()
+        )
+        document.attributes.update(
+            {
+                "date": date,
+                "order": order_nr,
+                "product": product_name,
+                "invoices": invoice_urls,
+            }
+        )
+        # some orders don't have invoices
+        if not invoice_urls:
+            document.attributes["warning"] = "no invoice available!"
+            return
+        document.url = invoice_urls[0]
+        document.attributes["filename"] = (
+            f"amazon-{date.strftime('%Y%m%d')}-"
+            f"{order_nr}-{slugify(product_name)}.pdf"
+        )
 
     def _orderfilter_options(self):
         # wait for dropdown to select orders
         # (last months, years, archived)
-        orderfilter = WebDriverWait(self.webdriver, self.TIMEOUT).until(
+        orderfilter = self.wait().until(
             EC.presence_of_element_located((By.XPATH, ".//select[@name='orderFilter']"))
         )
         # extract values of year options
@@ -228,12 +279,12 @@ class Amazon(docdl.SeleniumWebPortal):
 
     def _set_orderfilter(self, option):
         # find <select> for order filter
-        orderfilter = WebDriverWait(self.webdriver, self.TIMEOUT).until(
+        orderfilter = self.wait().until(
             EC.presence_of_element_located((By.XPATH, ".//select[@name='orderFilter']"))
         )
         # move <select> to front
         self.webdriver.execute_script("arguments[0].style.zIndex='99'", orderfilter)
-        orderfilter = WebDriverWait(self.webdriver, self.TIMEOUT).until(
+        orderfilter = self.wait().until(
             EC.element_to_be_clickable((By.XPATH, ".//select[@name='orderFilter']"))
         )
         # select current option
@@ -250,7 +301,7 @@ class Amazon(docdl.SeleniumWebPortal):
             # scroll to bottom
             self.scroll_to_bottom()
             # wait for loader to disappear
-            WebDriverWait(self.webdriver, self.TIMEOUT).until(
+            self.wait().until(
                 EC.invisibility_of_element_located(
                     (By.CSS_SELECTOR, ".rhf-loading-inner")
                 )
@@ -276,7 +327,7 @@ class Amazon(docdl.SeleniumWebPortal):
 
     def _send_username(self):
         # wait for email page
-        email = WebDriverWait(self.webdriver, self.TIMEOUT).until(
+        email = self.wait().until(
             EC.presence_of_element_located((By.CSS_SELECTOR, "input#ap_email"))
         )
         # send username
@@ -291,7 +342,7 @@ class Amazon(docdl.SeleniumWebPortal):
 
     def _wait_for_result(self, success_by, success_selector, error_by, error_selector):
         # wait for success element or error dialog
-        WebDriverWait(self.webdriver, self.TIMEOUT).until(
+        self.wait().until(
             lambda d: d.find_elements(success_by, success_selector)
             or d.find_elements(error_by, error_selector)
         )
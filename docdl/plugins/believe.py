@@ -4,7 +4,6 @@ import itertools
 import click
 from selenium.webdriver import ActionChains
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 
 import docdl
@@ -17,16 +16,26 @@ class BelieveBackstage(docdl.SeleniumWebPortal):
     URL_LOGOUT = f"{URL_ROOT}/?logout=1"
     URL_REPORTS = f"{URL_ROOT}/royalties/reportmanager"
 
+    # we wait for all elements we need
+    PAGE_LOAD_STRATEGY = "eager"
+
+    KEEP_SESSION = True
+
+    CAPABILITIES = docdl.Capabilities(
+        attributes=dict.fromkeys(("date", "category", "id", "amount"), "listing"),
+        concurrent=True,
+    )
+
     def login(self):
         """authenticate with username + password"""
         # load login page
-        self.webdriver.get(self.URL_ROOT)
+        self.get(self.URL_ROOT)
         # wait for page to load
-        WebDriverWait(self.webdriver, self.TIMEOUT).until(
+        self.wait().until(
             EC.visibility_of_element_located((By.XPATH, "//input[@id='signInName']"))
         )
         # wait form to become interactive
-        WebDriverWait(self.webdriver, self.TIMEOUT).until(
+        self.wait().until(
             EC.element_to_be_clickable((By.XPATH, "//input[@id='signInName']"))
         )
         # find input fields
@@ -47,7 +56,7 @@ class BelieveBackstage(docdl.SeleniumWebPortal):
         loginbutton.click()
 
         # wait for either login error message box or success message
-        WebDriverWait(self.webdriver, self.TIMEOUT).until(
+        self.wait().until(
             EC.visibility_of_element_located(
                 (
                     By.XPATH,
@@ -63,7 +72,7 @@ class BelieveBackstage(docdl.SeleniumWebPortal):
         )
 
     def logout(self):
-        self.webdriver.get(self.URL_LOGOUT)
+        self.get(self.URL_LOGOUT)
 
     def documents(self):
         return itertools.chain(self.financial_reports(), self.catalog())
@@ -78,9 +87,9 @@ class BelieveBackstage(docdl.SeleniumWebPortal):
     def financial_reports(self):
         """quarterly/monthly financial reports"""
         # fetch report overview
-        self.webdriver.get(self.URL_REPORTS)
+        self.get(self.URL_REPORTS)
         # wait for modal
-        WebDriverWait(self.webdriver, self.TIMEOUT).until(
+        self.wait().until(
             EC.visibility_of_element_located(
                 (
                     By.XPATH,
@@ -95,14 +104,22 @@ class BelieveBackstage(docdl.SeleniumWebPortal):
         if closebutton.is_displayed():
             closebutton.click()
         # wait for a download button
-        WebDriverWait(self.webdriver, self.TIMEOUT).until(
+        self.wait().until(
             EC.visibility_of_element_located(
                 (By.XPATH, "//a[contains(@class, 'fa-download')]")
             )
         )
 
+        # continue interrupted run?
+        page = self.resume.get("page", 0)
+        # skip pages we already got
+        for _ in range(page):
+            if not self._next_page():
+                break
         # walk all pages
         while True:
+            # we can resume from here
+            self.checkpoint(page=page)
             # get table
             tbody = self.webdriver.find_element(
                 By.XPATH, "//table[contains(@class,'table')]"
@@ -130,22 +147,27 @@ class BelieveBackstage(docdl.SeleniumWebPortal):
                     },
                 )
 
-            # next page
-            pagination = self.webdriver.find_element(
-                By.XPATH, "//ul[contains(@class,'pagination')]"
-            )
-            nextbutton = pagination.find_elements(
-                By.XPATH, ".//li[contains(@class, 'active')]/following-sibling::li/a"
-            )
-            # last page
-            if not nextbutton:
+            # last page?
+            if not self._next_page():
                 break
-            # go to next page
-            nextbutton[0].click()
-            # wait until we become stale (page loaded then)
-            WebDriverWait(self.webdriver, self.TIMEOUT).until(
-                EC.staleness_of(nextbutton[0])
-            )
+            page += 1
+
+    def _next_page(self):
+        """load next page of reports, :result: False on last page"""
+        pagination = self.webdriver.find_element(
+            By.XPATH, "//ul[contains(@class,'pagination')]"
+        )
+        nextbutton = pagination.find_elements(
+            By.XPATH, ".//li[contains(@class, 'active')]/following-sibling::li/a"
+        )
+        # last page
+        if not nextbutton:
+            return False
+        # go to next page
+        nextbutton[0].click()
+        # wait until we become stale (page loaded then)
+        self.wait().until(EC.staleness_of(nextbutton[0]))
+        return True
 
 
 @click.command()
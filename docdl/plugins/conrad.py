@@ -1,9 +1,10 @@
 """download documents from conrad.de"""
 
+import functools
 import re
 import click
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait, Select
+from selenium.webdriver.support.ui import Select
 from selenium.webdriver.support import expected_conditions as EC
 
 import docdl
@@ -17,14 +18,24 @@ class Conrad(docdl.SeleniumWebPortal):
     URL_LOGOUT = "https://api.conrad.de/session/1/logout"
     URL_INVOICES = "https://www.conrad.de/de/account.html#/invoices"
 
+    CAPABILITIES = docdl.Capabilities(
+        attributes=dict.fromkeys(
+            ("date", "number", "doctype", "amount", "id", "filename", "category"),
+            "listing",
+        ),
+        downloads=("click",),
+        # download elements can be relocated in other tabs
+        concurrent=True,
+    )
+
     def login(self):
         # load login page
-        self.webdriver.get(self.URL_LOGIN)
+        self.get(self.URL_LOGIN)
         # find fields
-        username = WebDriverWait(self.webdriver, self.TIMEOUT).until(
+        username = self.wait().until(
             EC.presence_of_element_located((By.CSS_SELECTOR, "input#username"))
         )
-        password = WebDriverWait(self.webdriver, self.TIMEOUT).until(
+        password = self.wait().until(
             EC.presence_of_element_located((By.CSS_SELECTOR, "input#password"))
         )
         # enter credentials
@@ -37,44 +48,24 @@ class Conrad(docdl.SeleniumWebPortal):
         # wait for page to load
         current_url = self.wait_for_urlchange(current_url)
         # wait for either login success or failure
-        WebDriverWait(self.webdriver, self.TIMEOUT).until(
-            lambda d: "Mein Konto" in d.title or "Conrad" in d.title
-        )
+        self.wait().until(lambda d: "Mein Konto" in d.title or "Conrad" in d.title)
         # Login failed
         if "Conrad" in self.webdriver.title:
             return False
         # close cookie notification
-        cookie_button = WebDriverWait(self.webdriver, self.TIMEOUT).until(
-            EC.visibility_of_element_located(
-                (By.XPATH, "//*[contains(text(), 'Ablehnen')]")
-            )
-        )
-        cookie_button.click()
+        self.dismiss((By.XPATH, "//*[contains(text(), 'Ablehnen')]"))
         return True
 
     def logout(self):
-        self.webdriver.get(self.URL_LOGOUT)
+        self.get(self.URL_LOGOUT)
 
     def documents(self):
         # wait for loader icon to disappear
-        WebDriverWait(self.webdriver, self.TIMEOUT).until(
+        self.wait().until(
             EC.invisibility_of_element_located((By.CSS_SELECTOR, "div.vld-icon"))
         )
         # load list of invoices
-        self.webdriver.get(self.URL_INVOICES)
-        # wait for time period selection
-        time_period = WebDriverWait(self.webdriver, self.TIMEOUT).until(
-            EC.presence_of_element_located(
-                (By.XPATH, "//select[@name='timePeriodProperty']")
-            )
-        )
-        time_period_select = Select(time_period)
-        # show all invoices
-        time_period_select.select_by_visible_text("Alle Rechnungen")
-        # wait for loader icon to disappear
-        WebDriverWait(self.webdriver, self.TIMEOUT).until(
-            EC.invisibility_of_element_located((By.CSS_SELECTOR, "div.vld-icon"))
-        )
+        self._load_invoices()
         # iterate all invoices
         for i, invoice in enumerate(
             self.webdriver.find_elements(By.XPATH, "//a[@data-e2e='invoiceList-item']")
@@ -117,6 +108,7 @@ class Conrad(docdl.SeleniumWebPortal):
             # create document
             yield docdl.Document(
                 download_element=invoice,
+                relocate=functools.partial(self._relocate, number),
                 attributes={
                     "date": docdl.util.parse_date(date),
                     "number": number,
@@ -128,6 +120,36 @@ class Conrad(docdl.SeleniumWebPortal):
                 },
             )
 
+    def _load_invoices(self):
+        """load list of all invoices in current tab"""
+        self.get(self.URL_INVOICES)
+        # wait for time period selection
+        time_period = self.wait().until(
+            EC.presence_of_element_located(
+                (By.XPATH, "//select[@name='timePeriodProperty']")
+            )
+        )
+        time_period_select = Select(time_period)
+        # show all invoices
+        time_period_select.select_by_visible_text("Alle Rechnungen")
+        # wait for loader icon to disappear
+        self.wait().until(
+            EC.invisibility_of_element_located((By.CSS_SELECTOR, "div.vld-icon"))
+        )
+
+    def _relocate(self, number):
+        """:result: link of invoice in current tab"""
+        number = docdl.util.xpath_string(" ".join(number.split()))
+        return self.relocate_element(
+            (
+                By.XPATH,
+                "//a[@data-e2e='invoiceList-item']"
+                "[.//div[@data-e2e='invoiceListItem-invoiceNumber']"
+                f"[normalize-space(.) = {number}]]",
+            ),
+            self._load_invoices,
+        )
+
 
 @click.command()
 @click.pass_context
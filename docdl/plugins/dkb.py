@@ -1,14 +1,14 @@
 """download documents from dkb.de"""
 
-import itertools
 import re
 import sys
 import click
+import lxml.html
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 
 import docdl
+import docdl.sources
 import docdl.util
 
 
@@ -19,17 +19,21 @@ class DKB(docdl.SeleniumWebPortal):
     URL_LOGOUT = "https://www.dkb.de/DkbTransactionBanking/banner.xhtml?$event=logout"
     URL_INBOX = "https://www.dkb.de/banking/postfach"
 
-    def __init__(self, login_id, password, useragent=None, arguments=None):
-        """use custom init to force image loading (for photoTAN)"""
-        if arguments and "load_images" in arguments and not arguments["load_images"]:
-            arguments["load_images"] = True
-        super().__init__(login_id, password, useragent, arguments)
+    # always load images (for chipTAN QR code)
+    ALLOWED_RESOURCES = ("images",)
+
+    CAPABILITIES = docdl.Capabilities(
+        attributes=dict.fromkeys(
+            ("date", "category", "subject", "unread", "id"), "listing"
+        ),
+        concurrent=True,
+    )
 
     def login(self):
         # load login page
-        self.webdriver.get(self.URL_LOGIN)
+        self.get(self.URL_LOGIN)
         # wait for username entry
-        WebDriverWait(self.webdriver, self.TIMEOUT).until(
+        self.wait().until(
             lambda d: d.find_elements(By.XPATH, "//input[@id='loginInputSelector']")
             or d.find_elements(By.XPATH, "//button[contains(text(), 'annehmen')]")
         )
@@ -51,7 +55,7 @@ class DKB(docdl.SeleniumWebPortal):
         password.send_keys(self.password)
         password.submit()
         # wait for photoTAN or "confirm with TAN" button
-        WebDriverWait(self.webdriver, self.TIMEOUT).until(
+        self.wait().until(
             EC.visibility_of_element_located(
                 (
                     By.XPATH,
@@ -75,14 +79,14 @@ class DKB(docdl.SeleniumWebPortal):
             nextbutton = self.webdriver.find_element(By.XPATH, "//button[@id='next']")
             nextbutton.click()
             # get qrcode
-            qrcode = WebDriverWait(self.webdriver, self.TIMEOUT).until(
+            qrcode = self.wait().until(
                 EC.visibility_of_element_located((By.XPATH, "//img[@alt='QR-Code']"))
             )
         # got qrcode
         else:
             qrcode = qrcode[0]
         # wait for QR code to be fully loaded
-        WebDriverWait(self.webdriver, self.TIMEOUT).until(EC.visibility_of(qrcode))
+        self.wait().until(EC.visibility_of(qrcode))
         # save current url
         current_url = self.webdriver.current_url
         # startcode
@@ -105,7 +109,7 @@ class DKB(docdl.SeleniumWebPortal):
         # wait for page to load
         self.wait_for_urlchange(current_url)
         # wait for logout button
-        WebDriverWait(self.webdriver, self.TIMEOUT).until(
+        self.wait().until(
             lambda d: "financialstatus" in d.current_url
             or "LoginWithTan" in d.current_url
             or d.current_url.endswith("banking")
@@ -114,108 +118,110 @@ class DKB(docdl.SeleniumWebPortal):
         return "financialstatus" in self.webdriver.current_url
 
     def logout(self):
-        self.webdriver.get(self.URL_LOGOUT)
+        self.get(self.URL_LOGOUT)
 
     def documents(self):
-        for i, document in enumerate(itertools.chain(self._inbox())):
-            # set an id
-            document.attributes["id"] = i
-            # return document
-            yield document
+        # the mailbox is plain HTML, list it without the browser
+        self.copy_to_requests_session()
+        return self._inbox()
 
     # ~ def accounts_csv(self):
     # ~ """get transactions of each account as csv"""
     # ~ # @todo
     # ~ pass
 
+    def _fetch(self, url, session=None):
+        """
+        :param session: requests session to use instead of self.session
+        :result: parsed HTML page with absolute links
+        """
+        req = (session or self.session).get(url)
+        req.raise_for_status()
+        page = lxml.html.document_fromstring(req.content, base_url=req.url)
+        page.make_links_absolute()
+        return page
+
     def _inbox(self):
-        def get_catlinks(table):
-            """get links of all categories and return them as list of tuples"""
-            catlinks = []
-            for row in table.find_elements(
-                By.XPATH, "//table[@id='welcomeMboTable']/tbody/tr"
-            ):
-                # get category
-                category = row.get_attribute("id").lower()
-                # get link to open category
-                subject = row.find_element(By.CSS_SELECTOR, "td.subject")
-                catlink = subject.find_element(By.CSS_SELECTOR, "a")
-                url = catlink.get_attribute("href")
-                catlinks += [(category, url)]
-            return catlinks
-
-        # load inbox
-        self.webdriver.get(self.URL_INBOX)
-        # wait for table
-        table = WebDriverWait(self.webdriver, self.TIMEOUT).until(
-            EC.visibility_of_element_located(
-                (By.XPATH, "//table[@id='welcomeMboTable']")
+        # load inbox and collect links of all categories
+        catlinks = []
+        for row in self._fetch(self.URL_INBOX).cssselect("table#welcomeMboTable tr"):
+            if catlink := row.cssselect("td.subject a"):
+                catlinks += [(row.get("id").lower(), catlink[0].get("href"))]
+
+        # continue interrupted run?
+        first_page = 0
+        if self.resume.get("category") in [category for category, _ in catlinks]:
+            while catlinks[0][0] != self.resume["category"]:
+                catlinks.pop(0)
+            first_page = self.resume["page"]
+        # count all documents
+        i = self.resume.get("id", 0)
+        # fetch pages of all categories at once, each with its own session
+        pages = docdl.sources.merge(
+            *(
+                docdl.sources.http_source(
+                    self._category(
+                        category,
+                        catlink,
+                        self.new_session(),
+                        first_page if n == 0 else 0,
+                    )
+                )
+                for n, (category, catlink) in enumerate(catlinks)
             )
         )
-        # iterate all category rows and collect links to categories
-        catlinks = get_catlinks(table)
-
-        # iterate all categories
-        for category, catlink in catlinks:
-            self.webdriver.get(catlink)
-            # iterate all pages
-            while True:
-                # iterate all documents
-                for row in self.webdriver.find_elements(
-                    By.CSS_SELECTOR, "table tbody tr.mbo-folderview-message"
-                ):
-                    # get read state
-                    classes = row.get_attribute("class")
-                    unread = "mbo-messageState-read" not in classes
-
-                    # get date
-                    date = (
-                        row.find_element(By.CSS_SELECTOR, "div.show-for-small-down")
-                        .get_attribute("textContent")
-                        .strip()
-                    )
-
-                    # get link to document
-                    link = row.find_element(
-                        By.XPATH, ".//td/a[@tid='getMailboxAttachment']"
-                    )
-                    url = link.get_attribute("href")
-                    topic = link.get_attribute("textContent").strip()
-                    # create document
-                    yield docdl.Document(
-                        url=url,
-                        attributes={
-                            "date": docdl.util.parse_date(date),
-                            "category": category,
-                            "subject": topic,
-                            "unread": unread,
-                        },
-                    )
-
-                # is there a next-button for pagination?
-                if not self._nextbutton():
-                    # quit
-                    break
-
-    def _nextbutton(self):
+        # iterate all pages
+        for category, page, messages in pages:
+            # we can resume from here
+            self.checkpoint(category=category, page=page, id=i)
+            # iterate all documents
+            for url, attributes in messages:
+                yield docdl.Document(url=url, attributes={**attributes, "id": i})
+                i += 1
+
+    def _category(self, category, url, session, first_page=0):
         """
-        find next-button on paginated page and return true/false
-        accordingly. Load next page if true.
+        generator that follows the pagination of a category
+
+        :param category: name of category
+        :param url: link to first page of category
+        :param session: requests session of this category
+        :param first_page: skip pages before this one
+        :result: (category, page number, list of (url, attributes)) tuples
         """
-        if nextspan := self.webdriver.find_elements(
-            By.CSS_SELECTOR, "span.pager-navigator-next"
-        ):
-            # click next button
-            nextbutton = nextspan[0].find_element(By.XPATH, "a")
-            self.webdriver.get(nextbutton.get_attribute("href"))
-            # wait for new folderview
-            WebDriverWait(self.webdriver, self.TIMEOUT).until(
-                EC.visibility_of_element_located(
-                    (By.CSS_SELECTOR, "table.expandableTable tbody")
+        page = 0
+        while url:
+            html = self._fetch(url, session)
+            if page >= first_page:
+                yield category, page, self._messages(html, category)
+            # is there a next-button for pagination?
+            nextbutton = html.cssselect("span.pager-navigator-next a")
+            url = nextbutton[0].get("href") if nextbutton else None
+            page += 1
+
+    @staticmethod
+    def _messages(html, category):
+        """:result: list of (url, attributes) tuples of messages on page"""
+        messages = []
+        for row in html.cssselect("table tr.mbo-folderview-message"):
+            # get read state
+            unread = "mbo-messageState-read" not in row.get("class", "")
+            # get date
+            date = row.cssselect("div.show-for-small-down")[0].text_content().strip()
+            # get link to document
+            link = row.xpath(".//td/a[@tid='getMailboxAttachment']")[0]
+            messages += [
+                (
+                    link.get("href"),
+                    {
+                        "date": docdl.util.parse_date(date),
+                        "category": category,
+                        "subject": link.text_content().strip(),
+                        "unread": unread,
+                    },
                 )
-            )
-            return True
-        return False
+            ]
+        return messages
 
 
 @click.command()
@@ -4,7 +4,6 @@ import re
 import click
 from selenium.common.exceptions import NoSuchElementException
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 
 import docdl
@@ -18,16 +17,37 @@ class Elster(docdl.SeleniumWebPortal):
     URL_LOGOUT = "https://www.elster.de/eportal/logout"
     URL_INBOX = "https://www.elster.de/eportal/meinelster/meinposteingang"
 
+    # downloads need the certificate password
+    SNIFF = False
+
+    KEEP_SESSION = True
+
+    CAPABILITIES = docdl.Capabilities(
+        attributes=dict.fromkeys(
+            (
+                "betreff",
+                "ordnungskriterium",
+                "profil",
+                "absender",
+                "date",
+                "unread",
+                "id",
+            ),
+            "listing",
+        ),
+        downloads=("click",),
+    )
+
     def login(self):
         """authenticate using certfile + password"""
-        self.webdriver.get(self.URL_LOGIN)
+        self.get(self.URL_LOGIN)
         # find input fields
         certfile = self.webdriver.find_element(
             By.XPATH, "//input[@id='loginBox.file_cert']"
         )
         password = self.webdriver.find_element(By.XPATH, "//input[@id='password']")
         # wait for entry field
-        WebDriverWait(self.webdriver, self.TIMEOUT).until(EC.visibility_of(password))
+        self.wait().until(EC.visibility_of(password))
         # fill in form
         certfile.send_keys(self.login_id)
         password.send_keys(self.password)
@@ -36,7 +56,7 @@ class Elster(docdl.SeleniumWebPortal):
         loginbutton.click()
 
         # wait for either login error message box or success message
-        WebDriverWait(self.webdriver, self.TIMEOUT).until(
+        self.wait().until(
             EC.visibility_of_element_located(
                 (
                     By.XPATH,
@@ -49,21 +69,28 @@ class Elster(docdl.SeleniumWebPortal):
         return "Mein ELSTER" in self.webdriver.title
 
     def logout(self):
-        self.webdriver.get(self.URL_LOGOUT)
+        self.get(self.URL_LOGOUT)
 
     def documents(self):
         # fetch inbox
-        self.webdriver.get(self.URL_INBOX)
+        self.get(self.URL_INBOX)
+        # continue interrupted run?
+        page = self.resume.get("page", 0)
         # count all extracted documents
-        i = 0
+        i = self.resume.get("id", 0)
+        # skip pages we already got
+        for _ in range(page):
+            self._next_page()
         # iterate all pages
         while True:
+            # we can resume from here
+            self.checkpoint(page=page, id=i)
             # count elements on this page
             i_page = 0
             # iterate all rows of table
             while True:
                 # wait for table
-                posteingang = WebDriverWait(self.webdriver, self.TIMEOUT).until(
+                posteingang = self.wait().until(
                     EC.presence_of_element_located(
                         (By.CSS_SELECTOR, "#posteingangModel tbody")
                     )
@@ -77,7 +104,7 @@ class Elster(docdl.SeleniumWebPortal):
                 # get current row
                 row = rows[i_page]
                 # get columns
-                downloadbutton = WebDriverWait(row, self.TIMEOUT).until(
+                downloadbutton = self.wait(row).until(
                     EC.presence_of_element_located(
                         (By.XPATH, ".//td[@data-rwd='Betreff']/*/button")
                     )
@@ -129,14 +156,29 @@ class Elster(docdl.SeleniumWebPortal):
                 i_page += 1
 
             # last page?
-            next_button = self.webdriver.find_element(
-                By.ID, "MeinPosteingangTable_pagination_next_page"
-            )
+            next_button = self._next_button()
             if not next_button.is_enabled():
                 # quit
                 break
             # load next page
-            next_button.click()
+            self._next_page()
+            page += 1
+
+    def _next_page(self):
+        """load next page of inbox and wait until it replaced the current one"""
+        rows = self.wait().until(
+            EC.presence_of_all_elements_located(
+                (By.CSS_SELECTOR, "#posteingangModel tbody tr")
+            )
+        )
+        self._next_button().click()
+        self.wait().until(EC.staleness_of(rows[0]))
+
+    def _next_button(self):
+        """:result: button to load next page of inbox"""
+        return self.webdriver.find_element(
+            By.ID, "MeinPosteingangTable_pagination_next_page"
+        )
 
     def download(self, document):
         """
@@ -146,7 +188,7 @@ class Elster(docdl.SeleniumWebPortal):
         # click to open download dialog
         document.download_element.click()
         # wait for "save as PDF" button
-        savebutton = WebDriverWait(self.webdriver, self.TIMEOUT).until(
+        savebutton = self.wait().until(
             EC.visibility_of_element_located(
                 (By.XPATH, "//button[@id='alsPDFSpeichern']")
             )
@@ -154,7 +196,7 @@ class Elster(docdl.SeleniumWebPortal):
         # click savebutton
         savebutton.click()
         # wait for password dialog
-        password = WebDriverWait(self.webdriver, self.TIMEOUT).until(
+        password = self.wait().until(
             EC.visibility_of_element_located(
                 (By.XPATH, "//input[@id='passwortEingeben']")
             )
@@ -2,7 +2,6 @@
 
 import click
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 
 import docdl
@@ -16,16 +15,23 @@ class Handyvertrag(docdl.SeleniumWebPortal):
     URL_LOGOUT = "https://service.handyvertrag.de/public/prelogout"
     URL_INVOICES = "https://service.handyvertrag.de/mytariff/invoice/showAll"
 
+    KEEP_SESSION = True
+
+    CAPABILITIES = docdl.Capabilities(
+        attributes=dict.fromkeys(("id", "date", "category", "subject"), "listing"),
+        concurrent=True,
+    )
+
     def login(self):
         """authenticate"""
-        self.webdriver.get(self.URL_LOGIN)
+        self.get(self.URL_LOGIN)
 
         # find entry field
         username = self.webdriver.find_element(
             By.XPATH, "//input[@id='UserLoginType_alias']"
         )
         # wait for entry field
-        WebDriverWait(self.webdriver, self.TIMEOUT).until(EC.visibility_of(username))
+        self.wait().until(EC.visibility_of(username))
         # send username
         username.send_keys(self.login_id)
         # save current URL
@@ -35,7 +41,7 @@ class Handyvertrag(docdl.SeleniumWebPortal):
             By.XPATH, "//input[@id='UserLoginType_password']"
         )
         # wait for entry field
-        WebDriverWait(self.webdriver, self.TIMEOUT).until(EC.visibility_of(password))
+        self.wait().until(EC.visibility_of(password))
         # send password
         password.send_keys(self.password)
         # submit form
@@ -43,7 +49,7 @@ class Handyvertrag(docdl.SeleniumWebPortal):
         # wait for page to load
         current_url = self.wait_for_urlchange(current_url)
         # wait for either login success, failure or "accept" button
-        WebDriverWait(self.webdriver, self.TIMEOUT).until(
+        self.wait().until(
             EC.presence_of_element_located(
                 (
                     By.XPATH,
@@ -63,11 +69,11 @@ class Handyvertrag(docdl.SeleniumWebPortal):
         return self.webdriver.find_elements(By.XPATH, "//img[contains(@alt, 'LOGOUT')]")
 
     def logout(self):
-        self.webdriver.get(self.URL_LOGOUT)
+        self.get(self.URL_LOGOUT)
 
     def documents(self):
         """fetch invoices"""
-        self.webdriver.get(self.URL_INVOICES)
+        self.get(self.URL_INVOICES)
 
         invoice_collapser = self.webdriver.find_elements(
             By.XPATH, '//*[contains(@id, "heading-rechnungen-")]/button'
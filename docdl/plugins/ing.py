@@ -3,7 +3,6 @@
 import itertools
 import click
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 
 import docdl
@@ -18,6 +17,19 @@ class ING(docdl.SeleniumWebPortal):
     URL_POSTBOX = "https://banking.ing.de/app/obligo/postbox"
     URL_TRANSACTIONS = "https://banking.ing.de/app/obligo/umsatzanzeige"
 
+    # always load images (for photoTAN)
+    ALLOWED_RESOURCES = ("images",)
+
+    KEEP_SESSION = True
+
+    # the csv export is clicked on the transactions page
+    CAPABILITIES = docdl.Capabilities(
+        attributes=dict.fromkeys(
+            ("date", "category", "subject", "unread", "id"), "listing"
+        ),
+        downloads=("url", "click"),
+    )
+
     def __init__(self, login_id, password, useragent=None, arguments=None):
         # don't use headless user agent to avoid ing.de mistaking us for a bot
         super().__init__(
@@ -30,9 +42,9 @@ class ING(docdl.SeleniumWebPortal):
 
     def login(self):
         # load login page
-        self.webdriver.get(self.URL_LOGIN)
+        self.get(self.URL_LOGIN)
         # wait for cookie accept button
-        dialog = WebDriverWait(self.webdriver, self.TIMEOUT).until(
+        dialog = self.wait().until(
             EC.visibility_of_element_located(
                 (By.XPATH, ".//*[@data-tag-name='ing-cc-dialog-level0']")
             )
@@ -72,7 +84,7 @@ class ING(docdl.SeleniumWebPortal):
 
         # wait for logout button (success) or tan input (failure) or
         # some ad modal (success)
-        WebDriverWait(self.webdriver, self.TIMEOUT).until(
+        self.wait().until(
             lambda d: d.find_elements(
                 By.XPATH, "//button[@class='session-button__logout-button']"
             )
@@ -85,22 +97,57 @@ class ING(docdl.SeleniumWebPortal):
         )
 
     def logout(self):
-        self.webdriver.get(self.URL_LOGOUT)
+        self.get(self.URL_LOGOUT)
 
     def documents(self):
+        postbox = self.webdriver.current_window_handle
+        # load transactions in a second tab while the postbox is scraped
+        # (browsers without tabs load one page after another)
+        transactions = None
+        if hasattr(self.webdriver, "switch_to"):
+            transactions = self._preload(self.URL_TRANSACTIONS)
         # chain all document types
-        docs = itertools.chain(self.postbox(), self.csv())
-        for i, document in enumerate(docs):
-            # set an id
-            document.attributes["id"] = i
-            # return document
-            yield document
-
-    def csv(self):
-        """scrape transaction csv as document"""
-        self.webdriver.get(self.URL_TRANSACTIONS)
+        docs = itertools.chain(self.postbox(), self.csv(transactions))
+        try:
+            for i, document in enumerate(docs):
+                # set an id
+                document.attributes["id"] = i
+                # return document
+                yield document
+        # also runs when the caller closes us after stopping early
+        finally:
+            if transactions:
+                self.webdriver.switch_to.window(transactions)
+                self.webdriver.close()
+                self.webdriver.switch_to.window(postbox)
+
+    def _preload(self, url):
+        """
+        start loading url in a new tab and switch back to the current one
+
+        :result: window handle of new tab
+        """
+        current = self.webdriver.current_window_handle
+        tab = self.new_tab()
+        self.ratelimiter.acquire(url)
+        # don't wait for the page to load
+        self.webdriver.execute_script("window.location.href = arguments[0]", url)
+        self.webdriver.switch_to.window(current)
+        return tab
+
+    def csv(self, tab=None):
+        """
+        scrape transaction csv as document
+
+        :param tab: window handle of tab that already loads the
+                    transactions page
+        """
+        if tab:
+            self.webdriver.switch_to.window(tab)
+        else:
+            self.get(self.URL_TRANSACTIONS)
         # open filter menu
-        filterbutton = WebDriverWait(self.webdriver, self.TIMEOUT).until(
+        filterbutton = self.wait().until(
             EC.visibility_of_element_located(
                 (By.XPATH, "//button[contains(@class, 'filters')]")
             )
@@ -120,14 +167,14 @@ class ING(docdl.SeleniumWebPortal):
         applybutton.click()
         self.scroll_to_bottom()
         # wait for export button
-        exportbutton = WebDriverWait(self.webdriver, self.TIMEOUT).until(
+        exportbutton = self.wait().until(
             EC.presence_of_element_located(
                 (By.XPATH, "//a[contains(text(),'Exportieren')]")
             )
         )
         exportbutton.click()
         # wait for CSV radio button
-        csvspan = WebDriverWait(self.webdriver, self.TIMEOUT).until(
+        csvspan = self.wait().until(
             EC.visibility_of_element_located(
                 (By.XPATH, "//span[contains(text(),'CSV')]")
             )
@@ -149,9 +196,9 @@ class ING(docdl.SeleniumWebPortal):
     def postbox(self):
         """scrape documents in postbox"""
         # open postbox
-        self.webdriver.get(self.URL_POSTBOX)
+        self.get(self.URL_POSTBOX)
         # wait for table
-        table = WebDriverWait(self.webdriver, self.TIMEOUT).until(
+        table = self.wait().until(
             EC.visibility_of_element_located((By.CSS_SELECTOR, "div.ibbr-table"))
         )
         # iterate rows
@@ -1,12 +1,11 @@
 """download documents from o2online.de"""
 
-import itertools
 import click
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 
 import docdl
+import docdl.sources
 import docdl.util
 
 
@@ -24,13 +23,21 @@ class O2(docdl.SeleniumWebPortal):
     URL_INVOICE_OVERVIEW = f"{URL_BILLING}/invoiceoverview"
     URL_VALUE_ADDED_INVOICE = f"{URL_BILLING}/value-added-services-invoices"
 
+    CAPABILITIES = docdl.Capabilities(
+        attributes=dict.fromkeys(
+            ("amount", "date", "number", "category", "filename", "year", "id"),
+            "listing",
+        ),
+        concurrent=True,
+    )
+
     def login(self):
         """authenticate"""
-        self.webdriver.get(self.URL_LOGIN)
+        self.get(self.URL_LOGIN)
         # find entry field
         username = self.webdriver.find_element(By.XPATH, "//input[@name='IDToken1']")
         # wait for entry field
-        WebDriverWait(self.webdriver, self.TIMEOUT).until(EC.visibility_of(username))
+        self.wait().until(EC.visibility_of(username))
         # send username
         username.send_keys(self.login_id)
         # save current URL
@@ -38,7 +45,7 @@ class O2(docdl.SeleniumWebPortal):
         # submit form
         username.submit()
         # wait for either password prompt or failure message
-        WebDriverWait(self.webdriver, self.TIMEOUT).until(
+        self.wait().until(
             EC.presence_of_element_located(
                 (
                     By.XPATH,
@@ -52,41 +59,43 @@ class O2(docdl.SeleniumWebPortal):
             By.XPATH, "//input[contains(@type, 'password')]"
         )
         # wait for entry field
-        WebDriverWait(self.webdriver, self.TIMEOUT).until(EC.visibility_of(password))
+        self.wait().until(EC.visibility_of(password))
         # send password
         password.send_keys(self.password)
         # submit form
         password.submit()
         # wait for page to load
         current_url = self.wait_for_urlchange(current_url)
-        # wait for cookie-banner container
-        WebDriverWait(self.webdriver, self.TIMEOUT).until(
+        # wait for cookie-banner container (persistent profiles may
+        # have consented already)
+        self.wait().until(
             EC.presence_of_element_located(
                 (
                     By.XPATH,
                     "//div[@id='usercentrics-root'] | "
-                    "//div[contains(@data-test-id, 'unified-login-error')]",
+                    "//div[contains(@data-test-id, 'unified-login-error')] | "
+                    "//a[contains(@href, 'auth/logout')]",
                 )
             )
         )
         # get cookie-banner container
-        if container := self.webdriver.find_element(
+        if container := self.webdriver.find_elements(
             By.XPATH, "//div[@id='usercentrics-root']"
         ):
-            # get inside DOM element so we can use XPATH
-            container = container.shadow_root.find_element(By.CSS_SELECTOR, "section")
+            shadow_root = container[0].shadow_root
+
+            def _reject_button(_driver):
+                # get inside DOM element so we can use XPATH
+                for section in shadow_root.find_elements(By.CSS_SELECTOR, "section"):
+                    for button in section.find_elements(
+                        By.XPATH, ".//button[contains(text(), 'Verweigern')]"
+                    ):
+                        if button.is_displayed():
+                            return button
+                return False
 
-            # wait for cookie banner
-            WebDriverWait(container, self.TIMEOUT).until(
-                EC.visibility_of_element_located(
-                    (By.XPATH, ".//button[contains(text(), 'Verweigern')]")
-                )
-            )
             # click "reject" button if there is one
-            button = container.find_element(
-                By.XPATH, ".//button[contains(text(), 'Verweigern')]"
-            )
-            button.click()
+            self.dismiss(_reject_button)
 
         # click "close" button if there is one
         closebutton = self.webdriver.find_elements(
@@ -101,23 +110,42 @@ class O2(docdl.SeleniumWebPortal):
         )
 
     def logout(self):
-        self.webdriver.get(self.URL_LOGOUT)
+        self.get(self.URL_LOGOUT)
 
     def documents(self):
         """fetch list of documents"""
-        for i, document in enumerate(
-            itertools.chain(self.invoices(), self.invoice_overview())
-        ):
+        # the billing api needs the cookies of the invoices page
+        self._open_invoices()
+        # fetch from all api endpoints at once, each with its own session
+        sources = docdl.sources.merge(
+            docdl.sources.http_source(self.invoices(self.new_session())),
+            docdl.sources.http_source(self.value_added_invoices(self.new_session())),
+            docdl.sources.http_source(self.invoice_overview(self.new_session())),
+        )
+        for i, document in enumerate(sources):
             # set an id
             document.attributes["id"] = i
             # return document
             yield document
 
-    def invoice_overview(self):
-        """fetch invoice overview"""
+    def _open_invoices(self):
+        """load invoices page and copy its cookies to the requests session"""
+        # save current URL
+        current_url = self.webdriver.current_url
+        # fetch normal invoices
+        self.get(self.URL_INVOICES)
+        # wait for page to load
+        self.wait_for_urlchange(current_url)
         # copy cookies to request session
         self.copy_to_requests_session()
-        req = self.session.get(self.URL_INVOICE_OVERVIEW)
+
+    def invoice_overview(self, session=None):
+        """
+        fetch invoice overview
+
+        :param session: requests session to use instead of self.session
+        """
+        req = (session or self.session).get(self.URL_INVOICE_OVERVIEW)
         assert req.status_code == 200
         invoiceoverview = req.json()
         years = invoiceoverview["invoices"].keys()
@@ -133,23 +161,25 @@ class O2(docdl.SeleniumWebPortal):
                 },
             )
 
-    def invoices(self):
-        """fetch list of invoices"""
-        # save current URL
-        current_url = self.webdriver.current_url
-        # fetch normal invoices
-        self.webdriver.get(self.URL_INVOICES)
-        # wait for page to load
-        current_url = self.wait_for_urlchange(current_url)
-        # copy cookies to request session
-        self.copy_to_requests_session()
+    def invoices(self, session=None):
+        """
+        fetch list of invoices
+
+        :param session: requests session to use instead of self.session
+        """
         # load invoice info json
-        req = self.session.get(self.URL_INVOICE_INFO)
+        req = (session or self.session).get(self.URL_INVOICE_INFO)
         for document in self.parse_invoices_json(req.json()):
             document.attributes["category"] = "invoice"
             yield document
-        # fetch value added invoices
-        req = self.session.get(self.URL_VALUE_ADDED_INVOICE)
+
+    def value_added_invoices(self, session=None):
+        """
+        fetch list of value added invoices
+
+        :param session: requests session to use instead of self.session
+        """
+        req = (session or self.session).get(self.URL_VALUE_ADDED_INVOICE)
         for document in self.parse_invoices_json(req.json()):
             document.attributes["category"] = "value_added_invoice"
             yield document
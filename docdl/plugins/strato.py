@@ -1,9 +1,10 @@
 """download documents from strato.de"""
 
+import functools
+import itertools
 import re
 import click
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 
 import docdl
@@ -15,21 +16,29 @@ class Strato(docdl.SeleniumWebPortal):
     download documents from strat
     """
 
+    # we wait for all elements we need
+    PAGE_LOAD_STRATEGY = "eager"
+
+    CAPABILITIES = docdl.Capabilities(
+        attributes=dict.fromkeys(
+            ("date", "doctype", "status", "amount", "id", "filename"), "listing"
+        ),
+        downloads=("click",),
+        concurrent=True,
+    )
+
     def login(self):
         # load homepage
-        self.webdriver.get("https://www.strato.de/apps/CustomerService")
+        self.get("https://www.strato.de/apps/CustomerService")
         # accept cookies
-        accept_cookies = WebDriverWait(self.webdriver, self.TIMEOUT).until(
-            EC.visibility_of_element_located((By.XPATH, "//button[@id='consentAgree']"))
-        )
-        accept_cookies.click()
+        self.dismiss((By.XPATH, "//button[@id='consentAgree']"))
         # find fields
-        username = WebDriverWait(self.webdriver, self.TIMEOUT).until(
+        username = self.wait().until(
             EC.visibility_of_element_located(
                 (By.XPATH, "//input[@autocomplete='username']")
             )
         )
-        password = WebDriverWait(self.webdriver, self.TIMEOUT).until(
+        password = self.wait().until(
             EC.presence_of_element_located((By.CSS_SELECTOR, "input#jss_ksb_password"))
         )
         # enter credentials
@@ -37,12 +46,12 @@ class Strato(docdl.SeleniumWebPortal):
         password.send_keys(self.password)
 
         # submit form
-        submit = WebDriverWait(self.webdriver, self.TIMEOUT).until(
+        submit = self.wait().until(
             EC.presence_of_element_located((By.XPATH, "//input[@type='submit']"))
         )
         submit.click()
         # wait for either login success or failure
-        WebDriverWait(self.webdriver, self.TIMEOUT).until(
+        self.wait().until(
             EC.presence_of_element_located(
                 (
                     By.XPATH,
@@ -55,7 +64,7 @@ class Strato(docdl.SeleniumWebPortal):
         return re.match(r".*(Ü|ü)bersicht.*", self.webdriver.title)
 
     def logout(self):
-        logoutbutton = WebDriverWait(self.webdriver, self.TIMEOUT).until(
+        logoutbutton = self.wait().until(
             EC.visibility_of_element_located(
                 (By.XPATH, "//*[contains(text(), 'Abmelden')]")
             )
@@ -66,17 +75,18 @@ class Strato(docdl.SeleniumWebPortal):
         # count all documents
         i = 0
         # load invoices overview
-        invoices_link = WebDriverWait(self.webdriver, self.TIMEOUT).until(
+        invoices_link = self.wait().until(
             EC.invisibility_of_element_located(
                 (By.XPATH, "//a[contains(@href,'OnlineInvoice')]")
             )
         )
-        self.webdriver.get(invoices_link.get_attribute("href"))
+        url = invoices_link.get_attribute("href")
+        self.get(url)
 
         # iterate all pages
-        while True:
+        for page in itertools.count():
             # wait for table of invoices
-            invoice_table = WebDriverWait(self.webdriver, self.TIMEOUT).until(
+            invoice_table = self.wait().until(
                 EC.visibility_of_element_located(
                     (By.XPATH, "//table[@id='invoice_table']")
                 )
@@ -109,6 +119,12 @@ class Strato(docdl.SeleniumWebPortal):
                 # create document
                 yield docdl.Document(
                     download_element=invoice_link,
+                    relocate=functools.partial(
+                        self._relocate,
+                        url,
+                        page,
+                        invoice_link.get_dom_attribute("href"),
+                    ),
                     attributes={
                         "date": docdl.util.parse_date(date),
                         "doctype": "invoice",
@@ -122,17 +138,35 @@ class Strato(docdl.SeleniumWebPortal):
                 i += 1
 
             # load next page
-            nextbutton = WebDriverWait(self.webdriver, self.TIMEOUT).until(
-                EC.visibility_of_element_located(
-                    (By.XPATH, "//a[contains(@class,'next')]")
-                )
-            )
+            nextbutton = self._next_button()
             # last page?
             if "disabled" in nextbutton.get_attribute("class"):
                 break
             # go to next page
             nextbutton.click()
 
+    def _next_button(self):
+        """:result: link to next page of invoices"""
+        return self.wait().until(
+            EC.visibility_of_element_located((By.XPATH, "//a[contains(@class,'next')]"))
+        )
+
+    def _relocate(self, url, page, href):
+        """:result: invoice link in current tab"""
+
+        def _load():
+            self.get(url)
+            for _ in range(page):
+                self._next_button().click()
+
+        return self.relocate_element(
+            (
+                By.XPATH,
+                f"//table[@id='invoice_table']//a[@href={docdl.util.xpath_string(href)}]",
+            ),
+            _load,
+        )
+
 
 @click.command()
 @click.pass_context
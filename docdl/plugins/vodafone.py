@@ -1,8 +1,8 @@
 """download documents from www.vodafone.de"""
 
+import functools
 import click
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 
 import docdl
@@ -20,22 +20,33 @@ class Vodafone(docdl.SeleniumWebPortal):
     URL_MY_DOCUMENTS = f"{URL_MYVODAFONE}/services/notifizierung/dokumente"
     URL_LOGOUT = f"{URL_BASE}/logout"
 
+    # list of documents on current page
+    XPATH_DOCUMENTS = "//ul[contains(@class, 'documents-inbox-container')]"
+
+    KEEP_SESSION = True
+
+    CAPABILITIES = docdl.Capabilities(
+        attributes=dict.fromkeys(("title", "date", "category", "id"), "listing"),
+        downloads=("click",),
+        concurrent=True,
+    )
+
     def login(self):
         """authenticate"""
         # load login page
-        self.webdriver.get(self.URL_LOGIN)
+        self.get(self.URL_LOGIN)
         # fill out login form when it appears
-        username = WebDriverWait(self.webdriver, self.TIMEOUT).until(
+        username = self.wait().until(
             EC.element_to_be_clickable((By.XPATH, "//input[@id='txtUsername']"))
         )
-        password = WebDriverWait(self.webdriver, self.TIMEOUT).until(
+        password = self.wait().until(
             EC.element_to_be_clickable((By.XPATH, "//input[@id='txtPassword']"))
         )
         username.send_keys(self.login_id)
         password.send_keys(self.password)
         password.submit()
         # wait for page element indicating success or error
-        WebDriverWait(self.webdriver, self.TIMEOUT).until(
+        self.wait().until(
             EC.any_of(
                 EC.presence_of_element_located((By.CSS_SELECTOR, ".contract-info")),
                 EC.element_to_be_clickable((By.XPATH, "//input[@id='txtUsername']")),
@@ -45,7 +56,7 @@ class Vodafone(docdl.SeleniumWebPortal):
         return len(self.webdriver.find_elements(By.CSS_SELECTOR, ".contract-info")) != 0
 
     def logout(self):
-        self.webdriver.get(self.URL_LOGOUT)
+        self.get(self.URL_LOGOUT)
 
     def documents(self):
         """fetch list of documents"""
@@ -60,21 +71,18 @@ class Vodafone(docdl.SeleniumWebPortal):
     def invoices(self):
         """iterate "Rechnungen"""
         # go to documents site
-        self.webdriver.get(self.URL_MY_DOCUMENTS)
-        # wait for documents
-        documents = WebDriverWait(self.webdriver, self.TIMEOUT).until(
-            EC.element_to_be_clickable(
-                (By.XPATH, "//ul[contains(@class, 'documents-inbox-container')]")
-            )
-        )
+        self.get(self.URL_MY_DOCUMENTS)
         # iterate all pages
-        while next_button := WebDriverWait(self.webdriver, self.TIMEOUT).until(
-            EC.element_to_be_clickable(
-                (By.XPATH, "//div[@id='pagination']/ol/li[3]/a[1]")
+        page = 0
+        while next_button := self._next_button():
+            # wait for documents
+            documents = self.wait().until(
+                EC.element_to_be_clickable((By.XPATH, self.XPATH_DOCUMENTS))
             )
-        ):
             # iterate all document elements
-            for element in documents.find_elements(By.CSS_SELECTOR, "li"):
+            for position, element in enumerate(
+                documents.find_elements(By.CSS_SELECTOR, "li")
+            ):
                 # get date
                 date = (
                     element.find_element(
@@ -98,6 +106,9 @@ class Vodafone(docdl.SeleniumWebPortal):
                 # generate document
                 yield docdl.Document(
                     download_element=dl_button,
+                    relocate=functools.partial(
+                        self._relocate, page, position, date, title
+                    ),
                     attributes={
                         "title": title,
                         "date": docdl.util.parse_date(date),
@@ -109,7 +120,49 @@ class Vodafone(docdl.SeleniumWebPortal):
                 # exit
                 break
             # go to next page
-            next_button.click()
+            self._next_page()
+            page += 1
+
+    def _next_button(self):
+        """:result: link to next page of documents"""
+        return self.wait().until(
+            EC.element_to_be_clickable(
+                (By.XPATH, "//div[@id='pagination']/ol/li[3]/a[1]")
+            )
+        )
+
+    def _next_page(self):
+        """load next page and wait until it replaced the current one"""
+        current = self.webdriver.find_elements(
+            By.XPATH, f"{self.XPATH_DOCUMENTS}//li"
+        ) or self.webdriver.find_elements(By.XPATH, self.XPATH_DOCUMENTS)
+        self._next_button().click()
+        if current:
+            self.wait().until(EC.staleness_of(current[0]))
+
+    def _relocate(self, page, position, date, title):
+        """:result: download button of document in current tab"""
+
+        def _load():
+            self.get(self.URL_MY_DOCUMENTS)
+            for _ in range(page):
+                self._next_page()
+
+        # date and title aren't unique, the position on the page is
+        date = docdl.util.xpath_string(" ".join(date.split()))
+        title = docdl.util.xpath_string(" ".join(title.split()))
+        return self.relocate_element(
+            (
+                By.XPATH,
+                f"({self.XPATH_DOCUMENTS}//li)[{position + 1}]"
+                "[.//*[@automation-id='documentsInboxes_date_tv']"
+                f"[normalize-space(.) = {date}]]"
+                "[.//*[@automation-id='documentsInboxes_type_tv']"
+                f"[normalize-space(.) = {title}]]"
+                "//*[@automation-id='documentsInboxes_download_btn']",
+            ),
+            _load,
+        )
 
 
 @click.command()
@@ -0,0 +1,129 @@
+"""per host rate limiting shared by requests and webdriver"""
+
+import email.utils
+import threading
+import time
+import urllib.parse
+
+
+class TokenBucket:
+    """
+    token bucket that allows "burst" requests at once and refills with
+    "rate" tokens per second
+    """
+
+    # never slow down below this rate (requests/second)
+    MIN_RATE = 0.05
+
+    def __init__(self, rate, burst):
+        """
+        :param rate: requests per second
+        :param burst: maximum number of requests at once
+        """
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        # don't hand out tokens before this time (Retry-After)
+        self.blocked_until = 0
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self):
+        """block until a token is available and take it"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self.blocked_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                # time until next token becomes available
+                wait = max(
+                    self.blocked_until - now, (1 - self.tokens) / self.rate, 0.01
+                )
+            time.sleep(wait)
+
+    def slow_down(self, retry_after=None):
+        """server asked us to slow down: halve rate and honour retry_after"""
+        with self.lock:
+            self.rate = max(self.rate / 2, self.MIN_RATE)
+            self.tokens = 0
+            if retry_after:
+                self.blocked_until = max(
+                    self.blocked_until, time.monotonic() + retry_after
+                )
+
+    def speed_up(self):
+        """request succeeded: slowly recover towards configured rate"""
+        with self.lock:
+            self.rate = min(self.rate * 1.1, self.max_rate)
+
+
+class RateLimiter:
+    """token bucket per host"""
+
+    def __init__(self, rate, burst):
+        """
+        :param rate: requests per second and host (0 = unlimited)
+        :param burst: maximum number of requests at once per host
+        """
+        self.rate = rate
+        self.burst = burst
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def bucket(self, url):
+        """:result: TokenBucket for host of url"""
+        host = urllib.parse.urlsplit(url).netloc
+        with self.lock:
+            if host not in self.buckets:
+                self.buckets[host] = TokenBucket(self.rate, self.burst)
+            return self.buckets[host]
+
+    def acquire(self, url):
+        """block until a request to url is allowed"""
+        if self.rate:
+            self.bucket(url).acquire()
+
+    def feedback(self, url, status_code, headers=None):
+        """adapt rate of host to response status"""
+        if not self.rate:
+            return
+        headers = headers or {}
+        # too many requests or service unavailable + retry-after header
+        if status_code == 429 or (status_code == 503 and "Retry-After" in headers):
+            self.bucket(url).slow_down(parse_retry_after(headers.get("Retry-After")))
+        elif status_code < 400:
+            self.bucket(url).speed_up()
+
+    # pylint: disable=W0613
+    def response_hook(self, response, *args, **kwargs):
+        """requests response hook"""
+        if not self.rate:
+            return
+        # let retried 429 responses slow us down as well
+        retries = getattr(response.raw, "retries", None)
+        for history in retries.history if retries else ():
+            if history.status == 429:
+                self.bucket(response.url).slow_down()
+        self.feedback(response.url, response.status_code, response.headers)
+
+
+def parse_retry_after(value):
+    """:result: seconds from Retry-After header value or None"""
+    if not value:
+        return None
+    # delay-seconds
+    if value.strip().isdigit():
+        return int(value)
+    # HTTP-date
+    try:
+        date = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0, date.timestamp() - time.time())
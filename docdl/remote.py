@@ -0,0 +1,38 @@
+"""start sessions on a running webdriver server (e.g. selenium standalone)"""
+
+from selenium import webdriver
+from selenium.webdriver.chromium.remote_connection import ChromiumRemoteConnection
+
+# chromium based browsers: name -> (devtools vendor prefix, browserName)
+CHROMIUM = {
+    "chrome": ("goog", "chrome"),
+    "edge": ("ms", "MicrosoftEdge"),
+}
+
+
+class RemoteChromiumDriver(webdriver.Remote):
+    """remote webdriver that can send chrome devtools protocol commands"""
+
+    def execute_cdp_cmd(self, cmd, cmd_args):
+        """:result: result of chrome devtools protocol command"""
+        return self.execute("executeCdpCommand", {"cmd": cmd, "params": cmd_args})[
+            "value"
+        ]
+
+
+def connect(url, browser, options):
+    """
+    start a new browser session on a webdriver server
+
+    :param url: url of webdriver server (e.g. http://localhost:4444)
+    :param browser: name of browser (see SeleniumWebPortal.WEBDRIVER)
+    :param options: selenium options of browser
+    :result: remote webdriver
+    """
+    if browser in CHROMIUM:
+        vendor_prefix, browser_name = CHROMIUM[browser]
+        return RemoteChromiumDriver(
+            command_executor=ChromiumRemoteConnection(url, vendor_prefix, browser_name),
+            options=options,
+        )
+    return webdriver.Remote(command_executor=url, options=options)
@@ -0,0 +1,240 @@
+"""
+run plugins periodically from a long-lived process (document-dl serve)
+
+The schedule is a json file:
+
+    {
+        "max_jobs": 2,
+        "jobs": [
+            {
+                "plugin": "vodafone",
+                "interval": 86400,
+                "jitter": 3600,
+                "params": {"username": "me", "password": "secret"},
+                "args": [],
+                "keep_session": true
+            }
+        ]
+    }
+
+"params" override the options of document-dl (e.g. "download_dir",
+"action" or "metrics_file") except GLOBAL_PARAMS, "args" are passed to
+the plugin command.
+"""
+
+import concurrent.futures
+import json
+import random
+import threading
+import time
+
+import click
+
+# options of document-dl that are applied once for the whole process
+# (by the documentdl() group), jobs can't change them
+GLOBAL_PARAMS = (
+    "browser",
+    "timeout",
+    "connect_timeout",
+    "retries",
+    "rate",
+    "burst",
+    "poll_frequency",
+    "concurrency",
+)
+
+
+class Session:
+    """logged in portal kept between runs of a job"""
+
+    def __init__(self, keep=None):
+        """
+        :param keep: keep portals logged in (None = if the plugin allows it)
+        """
+        self.keep_session = keep
+        self.portal = None
+        # contextlib.ExitStack that logs out
+        self.stack = None
+
+    def enabled(self, plugin_class):
+        """:result: True if portals of plugin_class should stay logged in"""
+        if self.keep_session is None:
+            return plugin_class.KEEP_SESSION
+        return self.keep_session
+
+    def keep(self, portal, stack):
+        """
+        remember logged in portal
+
+        :param portal: logged in docdl.WebPortal
+        :param stack: contextlib.ExitStack that logs out and cleans up
+        """
+        self.portal = portal
+        self.stack = stack
+
+    def close(self):
+        """logout"""
+        stack, self.portal, self.stack = self.stack, None, None
+        if stack:
+            stack.close()
+
+
+# pylint: disable=R0902
+class Job:
+    """plugin run that gets repeated every interval seconds"""
+
+    def __init__(self, job):
+        """
+        :param job: dict from schedule file
+        """
+        try:
+            self.plugin = job["plugin"]
+        except KeyError as error:
+            raise click.UsageError("schedule: job without plugin") from error
+        self.interval = job.get("interval", 86400)
+        self.jitter = job.get("jitter", 0)
+        self.params = job.get("params", {})
+        self.args = job.get("args", [])
+        self.session = Session(job.get("keep_session"))
+        self.account = self.params.get("username") or "default"
+        self.name = f"{self.plugin}-{self.account}"
+        # the logged in session can only be used by one run at a time
+        self.lock = threading.Lock()
+        # spread first runs over the jitter interval
+        self.next_run = time.monotonic() + random.uniform(0, self.jitter)
+        self.runs = 0
+
+    def schedule(self, now):
+        """set time of next run"""
+        self.next_run = now + self.interval + random.uniform(0, self.jitter)
+        self.runs += 1
+
+    def execute(self, ctx, browser=None, params=None, sink=None):
+        """
+        run plugin command of job once
+
+        :param ctx: click context of the document-dl group
+        :param browser: docdl.browser.SharedBrowser for selenium plugins
+        :param params: override root parameters of this job
+        :param sink: callable that gets found documents instead of stdout
+        """
+        command = ctx.command.get_command(ctx, self.plugin)
+        with self.lock, command.make_context(
+            self.plugin, list(self.args), parent=ctx
+        ) as job_ctx:
+            job_ctx.obj = {
+                "params": {**self.params, **(params or {})},
+                "session": self.session,
+                "browser": browser,
+                "sink": sink,
+            }
+            command.invoke(job_ctx)
+
+
+class Scheduler:
+    """run jobs when they are due, at most max_jobs at once"""
+
+    def __init__(self, ctx, jobs, max_jobs=1, browser=None):
+        """
+        :param ctx: click context of the document-dl group
+        :param jobs: list of Job
+        :param max_jobs: maximum number of jobs running at once
+        :param browser: docdl.browser.SharedBrowser for selenium plugins
+        """
+        self.ctx = ctx
+        self.jobs = jobs
+        self.max_jobs = max_jobs
+        self.browser = browser
+        self.stopped = threading.Event()
+        # check job parameters early
+        for job in jobs:
+            if not ctx.command.get_command(ctx, job.plugin):
+                raise click.UsageError(f"schedule: unknown plugin {job.plugin}")
+            unknown = set(job.params) - set(ctx.params)
+            if unknown:
+                raise click.UsageError(
+                    f"schedule: unknown params {', '.join(sorted(unknown))}"
+                )
+            fixed = set(job.params) & set(GLOBAL_PARAMS)
+            if fixed:
+                raise click.UsageError(
+                    f"schedule: params can only be set for all jobs: "
+                    f"{', '.join(sorted(fixed))}"
+                )
+
+    @classmethod
+    def load(cls, ctx, filename, max_jobs=None, browser=None):
+        """
+        :param filename: path of json schedule file
+        :result: Scheduler
+        """
+        with open(filename, encoding="utf-8") as file:
+            schedule = json.load(file)
+        return cls(
+            ctx,
+            [Job(job) for job in schedule.get("jobs", [])],
+            max_jobs or schedule.get("max_jobs", 1),
+            browser,
+        )
+
+    def execute(self, job):
+        """run job once"""
+        click.echo(f"{job.name}: run {job.runs}", err=True)
+        try:
+            job.execute(self.ctx, self.browser)
+        # keep serving when a job fails
+        except Exception as error:  # pylint: disable=W0718
+            click.echo(f"{job.name}: failed: {error!r}", err=True)
+
+    def run(self, once=False):
+        """
+        run jobs until stop() is called
+
+        :param once: return after every job ran once
+        """
+        running = {}
+        with concurrent.futures.ThreadPoolExecutor(self.max_jobs) as pool:
+            try:
+                while not self.stopped.is_set():
+                    now = time.monotonic()
+                    # start due jobs, longest waiting first
+                    waiting = sorted(
+                        (
+                            job
+                            for job in self.jobs
+                            if job not in running.values() and not (once and job.runs)
+                        ),
+                        key=lambda job: job.next_run,
+                    )
+                    for job in waiting:
+                        if len(running) >= self.max_jobs or job.next_run > now:
+                            break
+                        job.schedule(now)
+                        running[pool.submit(self.execute, job)] = job
+                    waiting = [job for job in waiting if job not in running.values()]
+                    if once and not running and not waiting:
+                        break
+                    # sleep until a job finishes or the next one is due
+                    timeout = None
+                    if waiting and len(running) < self.max_jobs:
+                        timeout = max(0, waiting[0].next_run - now)
+                    if running:
+                        done, _ = concurrent.futures.wait(
+                            running,
+                            timeout=timeout,
+                            return_when=concurrent.futures.FIRST_COMPLETED,
+                        )
+                        for future in done:
+                            del running[future]
+                    else:
+                        self.stopped.wait(timeout)
+            finally:
+                # don't start queued jobs, let running ones finish
+                self.stopped.set()
+                concurrent.futures.wait(running)
+                for job in self.jobs:
+                    job.session.close()
+
+    def stop(self):
+        """stop scheduling jobs"""
+        self.stopped.set()
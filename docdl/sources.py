@@ -0,0 +1,82 @@
+"""
+list independent document sources of a plugin concurrently
+
+Sources that only use HTTP are listed in background threads while the
+browser works on other sources. requests sessions aren't thread safe, so
+every source needs a session of its own (WebPortal.new_session()). Documents
+are still yielded in the order of the sources, so ids that are assigned
+while iterating stay stable.
+"""
+
+import concurrent.futures
+import queue
+import threading
+
+# marks the end of a source
+_END = object()
+
+
+class HTTPSource:
+    """
+    iterable of documents that doesn't use the webdriver, so it can be
+    listed in a background thread. It must use its own requests session
+    (WebPortal.new_session()) and must not call WebPortal.checkpoint()
+    either.
+    """
+
+    def __init__(self, iterable):
+        """
+        :param iterable: e.g. generator of docdl.Document
+        """
+        self.iterable = iterable
+        self.queue = queue.Queue()
+
+    def produce(self, stopped):
+        """list documents into queue until stopped is set"""
+        try:
+            for document in self.iterable:
+                if stopped.is_set():
+                    break
+                self.queue.put(document)
+        # hand errors over to the consumer
+        except BaseException as error:  # pylint: disable=W0718
+            self.queue.put(error)
+            return
+        self.queue.put(_END)
+
+    def __iter__(self):
+        while (item := self.queue.get()) is not _END:
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+
+
+def http_source(iterable):
+    """
+    :param iterable: documents listed with requests only
+    :result: HTTPSource for merge()
+    """
+    return HTTPSource(iterable)
+
+
+def merge(*sources, workers=4):
+    """
+    generator that yields the documents of all sources in order (like
+    itertools.chain). Sources wrapped with http_source() start listing
+    in background threads right away.
+
+    :param sources: iterables of docdl.Document or HTTPSource
+    :param workers: maximum number of background threads
+    """
+    stopped = threading.Event()
+    background = [source for source in sources if isinstance(source, HTTPSource)]
+    pool = concurrent.futures.ThreadPoolExecutor(max(1, min(workers, len(background))))
+    try:
+        for source in background:
+            pool.submit(source.produce, stopped)
+        for source in sources:
+            yield from source
+    finally:
+        # consumer stopped early or failed
+        stopped.set()
+        pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,67 @@
+"""HTTP transport for requests sessions (pooling, retries, timeouts)"""
+
+import requests
+import requests.adapters
+from urllib3.util.retry import Retry
+
+# retry requests that got one of these status codes
+RETRY_STATUS = (429, 500, 502, 503, 504)
+
+
+class TimeoutHTTPAdapter(requests.adapters.HTTPAdapter):
+    """HTTPAdapter that uses a default timeout for all requests"""
+
+    def __init__(self, *args, timeout=None, ratelimiter=None, **kwargs):
+        """
+        :param timeout: (connect timeout, read timeout) tuple in seconds
+        :param ratelimiter: docdl.ratelimit.RateLimiter for all requests
+        """
+        self.timeout = timeout
+        self.ratelimiter = ratelimiter
+        super().__init__(*args, **kwargs)
+
+    # pylint: disable=R0913,R0917
+    def send(
+        self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None
+    ):
+        # use default timeout if caller didn't set one
+        if timeout is None:
+            timeout = self.timeout
+        if self.ratelimiter:
+            self.ratelimiter.acquire(request.url)
+        return super().send(request, stream, timeout, verify, cert, proxies)
+
+
+# pylint: disable=R0913,R0917
+def create_session(
+    timeout, connect_timeout, retries, backoff, pool_size, ratelimiter=None
+):
+    """
+    :param timeout: seconds to wait for data
+    :param connect_timeout: seconds to wait for connection
+    :param retries: how often to retry failed requests
+    :param backoff: backoff factor between retries (seconds)
+    :param pool_size: connections kept open per host
+    :param ratelimiter: docdl.ratelimit.RateLimiter for all requests
+    :result: requests.Session() using TimeoutHTTPAdapter
+    """
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff,
+        status_forcelist=RETRY_STATUS,
+        # return response instead of raising when retries are exhausted
+        raise_on_status=False,
+        respect_retry_after_header=True,
+    )
+    adapter = TimeoutHTTPAdapter(
+        timeout=(connect_timeout, timeout),
+        max_retries=retry,
+        pool_maxsize=pool_size,
+        ratelimiter=ratelimiter,
+    )
+    session = requests.Session()
+    if ratelimiter:
+        session.hooks["response"].append(ratelimiter.response_hook)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
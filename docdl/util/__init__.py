@@ -1,9 +1,11 @@
 """some handy helpers"""
 
+import hashlib
 import platform
 import shutil
 import sys
 import os
+import tempfile
 
 from .dateparser import parse as parse_date  # noqa: F401 (import as shortcut)
 
@@ -15,6 +17,40 @@ def parse_decimal(decimal):
     return decimal
 
 
+def xpath_string(value):
+    """:result: value as XPath string literal (any quotes allowed)"""
+    if "'" not in value:
+        return f"'{value}'"
+    if '"' not in value:
+        return f'"{value}"'
+    parts = ', "\'", '.join(f"'{part}'" for part in value.split("'"))
+    return f"concat({parts})"
+
+
+def atomic_write(filename, content):
+    """
+    write text to file so readers never see partial content
+    (write temporary file in same directory, then rename)
+    """
+    directory = os.path.dirname(os.path.abspath(filename))
+    with tempfile.NamedTemporaryFile(
+        "w", dir=directory, prefix=".docdl-", delete=False
+    ) as tmp:
+        tmp.write(content)
+    # NamedTemporaryFile() creates files with 0600
+    os.chmod(tmp.name, 0o644)
+    os.replace(tmp.name, filename)
+
+
+def hash_file(filename, algorithm="sha256"):
+    """:result: hexdigest of file contents"""
+    digest = hashlib.new(algorithm)
+    with open(filename, "rb") as file:
+        while chunk := file.read(65536):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
 def show_image(filename, name="image"):
     """attempt to show image"""
     # always print image filename
@@ -17,12 +17,17 @@ setup(
         'click',
         'click-plugins',
         'jq',
+        'lxml',
+        'cssselect',
         'python-dateutil',
         'requests',
         'selenium >4.9.0, <4.12.0',
-        'slugify',
+        'python-slugify',
         'watchdog'
     ],
+    extras_require={
+        'fake': ['lxml', 'cssselect'],
+    },
     packages=find_packages(exclude=["tests*"]),
     entry_points={
         "docdl_plugins": [